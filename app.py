@@ -1,6 +1,11 @@
 from flask import Flask, render_template, request, send_file, jsonify, session, after_this_request
 import requests
+from requests.adapters import HTTPAdapter
+from requests.cookies import get_cookie_header
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
 from bs4 import BeautifulSoup
+from bs4.builder import builder_registry
 import os
 import re
 import json
@@ -21,6 +26,18 @@ import traceback
 import html
 import shutil
 import threading
+import atexit
+import hashlib
+import pickle
+import multiprocessing
+import codecs
+import zlib
+import sys
+from email.utils import parsedate_to_datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
 
 # Try to import Selenium
 SELENIUM_AVAILABLE = False
@@ -45,6 +62,87 @@ cssutils.log.setLevel(logging.CRITICAL)
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'dev_key_for_website_extractor')
 
+# Asset download concurrency: total parallel downloads per job and per asset host
+ASSET_DOWNLOAD_WORKERS = int(os.environ.get('ASSET_DOWNLOAD_WORKERS', '8'))
+ASSET_DOWNLOAD_PER_HOST = int(os.environ.get('ASSET_DOWNLOAD_PER_HOST', '4'))
+
+# On-disk HTTP cache for downloaded assets, shared by all jobs
+HTTP_CACHE_DIR = os.environ.get('HTTP_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'website_extractor_cache'))
+HTTP_CACHE_MAX_BYTES = int(os.environ.get('HTTP_CACHE_MAX_BYTES', str(500 * 1024 * 1024)))
+
+# Content-addressed store of compressed asset bodies, deduplicated across jobs
+BLOB_STORE_DIR = os.environ.get('BLOB_STORE_DIR', os.path.join(tempfile.gettempdir(), 'website_extractor_blobs'))
+BLOB_STORE_MAX_BYTES = int(os.environ.get('BLOB_STORE_MAX_BYTES', str(1024 * 1024 * 1024)))
+
+# Deflate level (0-9) for text entries; compressed media and fonts are stored as-is
+ZIP_DEFLATE_LEVEL = int(os.environ.get('ZIP_DEFLATE_LEVEL', '6'))
+
+# Streaming downloads: size limits per asset and per job (0 disables a limit)
+ASSET_MAX_BYTES = int(os.environ.get('ASSET_MAX_BYTES', str(100 * 1024 * 1024)))
+JOB_MAX_BYTES = int(os.environ.get('JOB_MAX_BYTES', str(1024 * 1024 * 1024)))
+STREAM_CHUNK_BYTES = 64 * 1024
+STREAM_INLINE_BYTES = 1024 * 1024  # Larger bodies are spooled to disk
+
+# Adaptive per-host rate limiting (requests per second) and retry backoff (seconds)
+RATE_LIMIT_INITIAL = float(os.environ.get('RATE_LIMIT_INITIAL', '10'))
+RATE_LIMIT_MIN = float(os.environ.get('RATE_LIMIT_MIN', '0.5'))
+RATE_LIMIT_MAX = float(os.environ.get('RATE_LIMIT_MAX', '50'))
+RATE_LIMIT_BURST = int(os.environ.get('RATE_LIMIT_BURST', '10'))
+RATE_LIMIT_STEP = 0.5  # Rate increase per successful response
+RETRY_BACKOFF_BASE = float(os.environ.get('RETRY_BACKOFF_BASE', '0.5'))
+RETRY_BACKOFF_MAX = float(os.environ.get('RETRY_BACKOFF_MAX', '30'))
+# Longest Retry-After pause honored; hosts asking for more are given up on for the job
+RATE_LIMIT_MAX_PAUSE = float(os.environ.get('RATE_LIMIT_MAX_PAUSE', str(RETRY_BACKOFF_MAX)))
+
+# Per-job failure handling: retries per asset, consecutive failures before a host
+# is skipped, and the share of job time that retries may take
+FETCH_MAX_RETRIES = int(os.environ.get('FETCH_MAX_RETRIES', '2'))
+CIRCUIT_BREAKER_THRESHOLD = int(os.environ.get('CIRCUIT_BREAKER_THRESHOLD', '5'))
+RETRY_BUDGET_SHARE = float(os.environ.get('RETRY_BUDGET_SHARE', '0.2'))
+RETRY_BUDGET_MIN_SECONDS = float(os.environ.get('RETRY_BUDGET_MIN_SECONDS', '5'))
+
+# Process-wide HTTP connection pools: number of hosts kept and connections per host
+HTTP_POOL_CONNECTIONS = int(os.environ.get('HTTP_POOL_CONNECTIONS', '100'))
+HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', '32'))
+
+# HTML parser used for the page: 'html.parser' (default), 'lxml', 'html5lib' or 'auto' (fastest
+# installed); the others stay as fallbacks. Bulk jobs can opt into lxml for speed.
+HTML_PARSER_BACKEND = os.environ.get('HTML_PARSER_BACKEND', 'html.parser').strip().lower()
+
+# Deepest level of nested CSS @import followed (stylesheets linked from the page are level 0)
+CSS_IMPORT_MAX_DEPTH = int(os.environ.get('CSS_IMPORT_MAX_DEPTH', '5'))
+
+# Scanning downloaded JS bundles for lazily loaded chunks: scan processes (0 scans
+# in the download threads), largest bundle scanned, and chunks added per job
+JS_SCAN_WORKERS = int(os.environ.get('JS_SCAN_WORKERS', str(min(4, os.cpu_count() or 1))))
+JS_SCAN_MAX_BYTES = int(os.environ.get('JS_SCAN_MAX_BYTES', str(20 * 1024 * 1024)))
+JS_CHUNK_LIMIT = int(os.environ.get('JS_CHUNK_LIMIT', '1000'))
+
+# Headless Chrome pool for Selenium renders: browsers kept open, renders before a
+# browser is replaced, its memory limit in MB (0 disables both) and the wait for a free one
+CHROME_POOL_SIZE = int(os.environ.get('CHROME_POOL_SIZE', '2'))
+CHROME_MAX_USES = int(os.environ.get('CHROME_MAX_USES', '50'))
+CHROME_MAX_RSS_MB = int(os.environ.get('CHROME_MAX_RSS_MB', '1500'))
+CHROME_CHECKOUT_TIMEOUT = float(os.environ.get('CHROME_CHECKOUT_TIMEOUT', '60'))
+
+# Selenium page readiness: quiet time (ms) without network or DOM activity that counts as
+# settled after load, and after each scroll step or click; total time a render may wait (s)
+SELENIUM_IDLE_MS = int(os.environ.get('SELENIUM_IDLE_MS', '500'))
+SELENIUM_STEP_IDLE_MS = int(os.environ.get('SELENIUM_STEP_IDLE_MS', '150'))
+SELENIUM_WAIT_SECONDS = float(os.environ.get('SELENIUM_WAIT_SECONDS', '15'))
+SELENIUM_STEP_MAX_SECONDS = 2.0  # Longest wait for a single scroll step
+
+# Reuse the asset bodies Chrome downloads during a render instead of fetching them
+# again (1 enables), and how much Chrome keeps of one page's bodies (bytes)
+SELENIUM_CAPTURE_BODIES = os.environ.get('SELENIUM_CAPTURE_BODIES', '1') == '1'
+SELENIUM_CAPTURE_BUFFER_BYTES = int(os.environ.get('SELENIUM_CAPTURE_BUFFER_BYTES', str(200 * 1024 * 1024)))
+
+# Requests Selenium renders never make: known tracker, ad and chat widget hosts (1 enables),
+# media files (1 enables) and extra comma-separated hosts. Blocked URLs are listed in the zip.
+SELENIUM_BLOCK_TRACKERS = os.environ.get('SELENIUM_BLOCK_TRACKERS', '1') == '1'
+SELENIUM_BLOCK_MEDIA = os.environ.get('SELENIUM_BLOCK_MEDIA', '0') == '1'
+SELENIUM_BLOCKED_HOSTS = [host.strip().lower() for host in os.environ.get('SELENIUM_BLOCKED_HOSTS', '').split(',') if host.strip()]
+
 def is_binary_content(content, asset_type):
     """Determine if content should be treated as binary or text based on asset type and content inspection"""
     # First check by asset type
@@ -74,6 +172,144 @@ def is_binary_content(content, asset_type):
     # For anything else, just check if it's bytes
     return isinstance(content, bytes)
 
+def parse_retry_after(value):
+    """Return the delay in seconds requested by a Retry-After header, or None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return int(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(retry_at.tzinfo)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt, base=RETRY_BACKOFF_BASE, cap=RETRY_BACKOFF_MAX):
+    """Exponential backoff with full jitter for the given retry attempt (0-based)"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+class HostRateLimiter:
+    """
+    Adaptive token-bucket rate limiter keyed by host, shared by every fetch in the process.
+
+    Each host starts at `initial_rate` requests per second. Successful responses
+    raise the rate additively up to `max_rate`; 429 and 503 responses halve it
+    (down to `min_rate`) and pause the host for as long as Retry-After asks,
+    but never longer than `max_pause`.
+
+    Args:
+        initial_rate: Starting requests per second for a new host
+        min_rate: Lowest rate a host can be throttled down to
+        max_rate: Highest rate a host can ramp up to
+        burst: Number of requests a host may make back to back
+        max_pause: Longest Retry-After pause in seconds
+    """
+    def __init__(self, initial_rate, min_rate, max_rate, burst, max_pause=RATE_LIMIT_MAX_PAUSE):
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.max_pause = max_pause
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, host):
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = {
+                'rate': self.initial_rate,
+                'tokens': float(self.burst),
+                'updated': time.monotonic(),
+                'blocked_until': 0.0,
+            }
+        return bucket
+
+    def acquire(self, url):
+        """Block until a request to the URL's host is allowed; returns the time waited"""
+        host = urlparse(url).netloc.lower()
+        waited = 0.0
+        while True:
+            with self._lock:
+                bucket = self._bucket(host)
+                now = time.monotonic()
+                bucket['tokens'] = min(self.burst, bucket['tokens'] + (now - bucket['updated']) * bucket['rate'])
+                bucket['updated'] = now
+                delay = bucket['blocked_until'] - now
+                if delay <= 0:
+                    if bucket['tokens'] >= 1:
+                        bucket['tokens'] -= 1
+                        return waited
+                    delay = (1 - bucket['tokens']) / bucket['rate']
+            time.sleep(delay)
+            waited += delay
+
+    def update(self, url, status_code, headers=None):
+        """Adapt the host's rate to a response status"""
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            bucket = self._bucket(host)
+            if status_code in (429, 503):
+                bucket['rate'] = max(self.min_rate, bucket['rate'] / 2)
+                bucket['tokens'] = 0.0
+                retry_after = parse_retry_after((headers or {}).get('Retry-After'))
+                if retry_after:
+                    pause = min(retry_after, self.max_pause)
+                    bucket['blocked_until'] = max(bucket['blocked_until'], time.monotonic() + pause)
+            elif status_code < 400:
+                bucket['rate'] = min(self.max_rate, bucket['rate'] + RATE_LIMIT_STEP)
+
+    def snapshot(self):
+        """Current rate per host"""
+        with self._lock:
+            return {host: round(bucket['rate'], 2) for host, bucket in self._buckets.items()}
+
+RATE_LIMITER = HostRateLimiter(RATE_LIMIT_INITIAL, RATE_LIMIT_MIN, RATE_LIMIT_MAX, RATE_LIMIT_BURST,
+                               RATE_LIMIT_MAX_PAUSE)
+
+class SharedHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose connection pools live for the whole process.
+
+    urllib3 keeps one pool per host inside the adapter, so mounting a single
+    instance on every job session lets jobs reuse keep-alive connections to
+    the same hosts. Closing a job session leaves the shared pools open.
+    """
+    def close(self):
+        pass
+
+    def pool_stats(self):
+        """Connections opened and requests served per host pool"""
+        stats = {}
+        pools = self.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host = f"{key.key_scheme}://{key.key_host}:{key.key_port}"
+            stats[host] = {
+                'connections': pool.num_connections,
+                'requests': pool.num_requests,
+                'reused': max(0, pool.num_requests - pool.num_connections),
+            }
+        return stats
+
+SHARED_HTTP_ADAPTER = SharedHTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE)
+
+def new_job_session():
+    """Create a requests.Session with its own cookie jar on the shared connection pools"""
+    session_obj = requests.Session()
+    session_obj.mount('http://', SHARED_HTTP_ADAPTER)
+    session_obj.mount('https://', SHARED_HTTP_ADAPTER)
+    return session_obj
+
+def rate_limited_get(session_obj, url, **kwargs):
+    """session_obj.get(url, **kwargs) paced by the shared per-host rate limiter"""
+    RATE_LIMITER.acquire(url)
+    response = session_obj.get(url, **kwargs)
+    RATE_LIMITER.update(url, response.status_code, response.headers)
+    return response
+
 def download_asset(url, base_url, headers=None, session_obj=None):
     """
     Download an asset from a URL
@@ -128,34 +364,22 @@ def download_asset(url, base_url, headers=None, session_obj=None):
         print(f"Error parsing URL {url}: {str(e)}")
         return None
     
-    # Add a delay to avoid rate limiting
-    time.sleep(0.1)  # 100ms delay between requests
-    
     # Maximum number of retries
     max_retries = 3
     retry_count = 0
     
     while retry_count < max_retries:
         try:
-            # Use session if provided, otherwise make a direct request
-            if session_obj:
-                response = session_obj.get(
-                    url, 
-                    timeout=15, 
-                    headers=headers, 
-                    stream=True, 
-                    allow_redirects=True,
-                    verify=False  # Ignore SSL certificate errors
-                )
-            else:
-                response = requests.get(
-                    url, 
-                    timeout=15, 
-                    headers=headers, 
-                    stream=True, 
-                    allow_redirects=True,
-                    verify=False  # Ignore SSL certificate errors
-                )
+            # Use session if provided, otherwise a fresh one on the shared connection pools
+            response = HTTP_CACHE.get(
+                session_obj or new_job_session(),
+                url, 
+                headers=headers, 
+                timeout=15, 
+                stream=True, 
+                allow_redirects=True,
+                verify=False  # Ignore SSL certificate errors
+            )
             
             # Handle redirects
             if response.history:
@@ -165,7 +389,16 @@ def download_asset(url, base_url, headers=None, session_obj=None):
             if response.status_code == 200:
                 # Check the Content-Type header
                 content_type = response.headers.get('Content-Type', '')
-                print(f"Downloaded {url} ({len(response.content)} bytes, type: {content_type})")
+                
+                # Read the body in chunks so oversized downloads are aborted early
+                try:
+                    entry = stream_response_body(response, max_bytes=ASSET_MAX_BYTES)
+                except AssetTooLargeError as e:
+                    print(f"Skipping oversized asset: {str(e)}")
+                    return None
+                HTTP_CACHE.store(url, response, entry)
+                content = entry['body']
+                print(f"Downloaded {url} ({len(content)} bytes, type: {content_type})")
                 
                 # Check for binary content types
                 is_binary = any(binary_type in content_type.lower() for binary_type in [
@@ -175,7 +408,7 @@ def download_asset(url, base_url, headers=None, session_obj=None):
                 
                 # If binary or content-type suggests binary, return raw content
                 if is_binary:
-                    return response.content
+                    return content
                 
                 # For text content types
                 is_text = any(text_type in content_type.lower() for text_type in [
@@ -192,35 +425,40 @@ def download_asset(url, base_url, headers=None, session_obj=None):
                     
                     # From response encoding or apparent encoding
                     if not encoding:
-                        encoding = response.encoding or response.apparent_encoding or 'utf-8'
+                        encoding = response.encoding or requests.compat.chardet.detect(content)['encoding'] or 'utf-8'
                     
                     # Decode with specified encoding
                     try:
-                        return response.content.decode(encoding, errors='replace').encode('utf-8')
+                        return content.decode(encoding, errors='replace').encode('utf-8')
                     except (UnicodeDecodeError, LookupError):
                         # If decoding fails, try utf-8
                         try:
-                            return response.content.decode('utf-8', errors='replace').encode('utf-8')
+                            return content.decode('utf-8', errors='replace').encode('utf-8')
                         except:
                             # If all else fails, return raw content
-                            return response.content
+                            return content
                 
                 # For unknown content types, return raw content
-                return response.content
-            elif response.status_code == 404:
+                return content
+            
+            # Release the connection; error bodies are never read
+            response.close()
+            
+            if response.status_code == 404:
                 print(f"Resource not found (404): {url}")
                 return None
             elif response.status_code == 403:
                 print(f"Access forbidden (403): {url}")
                 # Try with a different user agent on the next retry
                 headers['User-Agent'] = random.choice(user_agents)
+                time.sleep(backoff_delay(retry_count))
                 retry_count += 1
-                time.sleep(1)  # Wait longer before retrying
                 continue
-            elif response.status_code >= 500:
+            elif response.status_code == 429 or response.status_code >= 500:
+                # The rate limiter has already slowed this host down and honors Retry-After
                 print(f"Server error ({response.status_code}): {url}")
+                time.sleep(backoff_delay(retry_count))
                 retry_count += 1
-                time.sleep(1)  # Wait longer before retrying
                 continue
             else:
                 print(f"HTTP error ({response.status_code}): {url}")
@@ -228,13 +466,13 @@ def download_asset(url, base_url, headers=None, session_obj=None):
                 
         except requests.exceptions.Timeout:
             print(f"Timeout error downloading {url}")
+            time.sleep(backoff_delay(retry_count))
             retry_count += 1
-            time.sleep(1)
             continue
         except requests.exceptions.ConnectionError:
             print(f"Connection error downloading {url}")
+            time.sleep(backoff_delay(retry_count))
             retry_count += 1
-            time.sleep(1)
             continue
         except requests.exceptions.TooManyRedirects:
             print(f"Too many redirects for {url}")
@@ -248,124 +486,1056 @@ def download_asset(url, base_url, headers=None, session_obj=None):
     
     return None
 
+def normalize_url(url):
+    """Normalize a URL so that equivalent spellings map to the same key"""
+    parsed = urlparse(url)
+    scheme = parsed.scheme.lower()
+    netloc = parsed.netloc.lower()
+    # Drop default ports
+    if (scheme == 'http' and netloc.endswith(':80')) or (scheme == 'https' and netloc.endswith(':443')):
+        netloc = netloc.rsplit(':', 1)[0]
+    # Fragments are never sent to the server
+    return urlunparse((scheme, netloc, parsed.path or '/', parsed.params, parsed.query, ''))
+
+class AssetTooLargeError(Exception):
+    """Raised when a download exceeds the per-asset or per-job byte limit"""
+
+def stream_response_body(response, max_bytes=None, consume=None, spool_dir=None):
+    """
+    Read a streamed response body in chunks, enforcing byte limits as it goes.
+
+    Bodies up to STREAM_INLINE_BYTES are kept in memory. Larger bodies are
+    spooled to a file in `spool_dir`; without a spool_dir everything stays in memory.
+
+    Args:
+        response: requests.Response opened with stream=True
+        max_bytes: Maximum size of this body, or None for no limit
+        consume: Optional callable charged with every chunk size; raises AssetTooLargeError
+            when a shared budget is exhausted
+        spool_dir: Directory for bodies too large to keep in memory
+
+    Returns:
+        dict: body (bytes or None), body_path (file path or None), size and sha256 of the body
+    """
+    declared = response.headers.get('Content-Length', '')
+    if max_bytes and declared.isdigit() and int(declared) > max_bytes:
+        response.close()
+        raise AssetTooLargeError(f"{response.url} is {declared} bytes (limit {max_bytes})")
+
+    digest = hashlib.sha256()
+    buffer = bytearray()
+    spool = None
+    body_path = None
+    size = 0
+    try:
+        for chunk in response.iter_content(STREAM_CHUNK_BYTES):
+            size += len(chunk)
+            if max_bytes and size > max_bytes:
+                raise AssetTooLargeError(f"{response.url} exceeds {max_bytes} bytes")
+            if consume is not None:
+                consume(len(chunk))
+            digest.update(chunk)
+            if spool is not None:
+                spool.write(chunk)
+                continue
+            buffer += chunk
+            if spool_dir and len(buffer) > STREAM_INLINE_BYTES:
+                fd, body_path = tempfile.mkstemp(dir=spool_dir, suffix='.body')
+                spool = os.fdopen(fd, 'wb')
+                spool.write(buffer)
+                buffer = None
+    except BaseException:
+        if spool is not None:
+            spool.close()
+            os.remove(body_path)
+        raise
+    finally:
+        response.close()
+        if getattr(response, 'from_cache', False):
+            response.raw.close()
+
+    if spool is not None:
+        spool.close()
+        return {'body': None, 'body_path': body_path, 'size': size, 'sha256': digest.hexdigest()}
+    return {'body': bytes(buffer), 'body_path': None, 'size': size, 'sha256': digest.hexdigest()}
+
+def open_body(entry):
+    """Open a content store entry body as a binary file object"""
+    if entry.get('body_path'):
+        return open(entry['body_path'], 'rb')
+    return BytesIO(entry['body'] or b'')
+
+def read_body(entry):
+    """Return a content store entry body as bytes"""
+    if entry.get('body_path'):
+        with open(entry['body_path'], 'rb') as f:
+            return f.read()
+    return entry['body'] or b''
+
+def decode_body(entry):
+    """Decode a content store entry body as text using the charset from its Content-Type"""
+    content_type = entry['headers'].get('Content-Type', '') if entry['headers'] else ''
+    encoding = 'utf-8'
+    if 'charset=' in content_type:
+        encoding = content_type.split('charset=')[1].split(';')[0].strip()
+    body = read_body(entry)
+    try:
+        return body.decode(encoding, errors='replace')
+    except LookupError:
+        return body.decode('utf-8', errors='replace')
+
+# Bytes of the page searched for a <meta> charset, as browsers do
+CHARSET_PRESCAN_BYTES = 1024
+# Bytes handed to statistical detection when nothing declares an encoding
+CHARSET_DETECT_BYTES = 64 * 1024
+# Python codecs for legacy labels that browsers decode with a superset
+BROWSER_ENCODING_OVERRIDES = {
+    'iso8859-1': 'cp1252',
+    'ascii': 'cp1252',
+    'gb2312': 'gbk',
+    'shift_jis': 'cp932',
+    'euc_kr': 'cp949',
+}
+META_TAG_PATTERN = re.compile(rb'<!--.*?-->|<meta[\s/]([^>]*)', re.IGNORECASE | re.DOTALL)
+META_ATTRIBUTE_PATTERN = re.compile(rb'([^\s=/>]+)(?:\s*=\s*("[^"]*"|\'[^\']*\'|[^\s>]+))?')
+CHARSET_PARAM_PATTERN = re.compile(rb'charset\s*=\s*["\']?([^\s"\';]+)', re.IGNORECASE)
+
+def lookup_encoding(label):
+    """Map a charset label to the Python codec a browser would effectively use, or None"""
+    if isinstance(label, bytes):
+        label = label.decode('ascii', errors='ignore')
+    try:
+        name = codecs.lookup(label.strip()).name
+    except (LookupError, ValueError):
+        return None
+    return BROWSER_ENCODING_OVERRIDES.get(name, name)
+
+def prescan_meta_charset(head):
+    """
+    Look for a <meta charset> or http-equiv Content-Type declaration.
+
+    A simplified version of the HTML spec's prescan: comments are skipped and
+    only <meta> tags in `head` are looked at.
+
+    Args:
+        head: First bytes of the document
+
+    Returns:
+        str: Codec name, or None
+    """
+    for match in META_TAG_PATTERN.finditer(head):
+        if match.group(1) is None:
+            continue  # Comment
+        attributes = {}
+        for name, value in META_ATTRIBUTE_PATTERN.findall(match.group(1)):
+            attributes.setdefault(name.lower(), value.strip(b'"\''))
+        label = attributes.get(b'charset')
+        if not label and attributes.get(b'http-equiv', b'').lower() == b'content-type':
+            param = CHARSET_PARAM_PATTERN.search(attributes.get(b'content', b''))
+            label = param.group(1) if param else None
+        encoding = lookup_encoding(label) if label else None
+        if encoding:
+            # A document can't declare itself UTF-16 from inside its own bytes
+            return 'utf-8' if encoding.startswith('utf-16') else encoding
+    return None
+
+def decode_html(body, content_type=''):
+    """
+    Decode an HTML response body once, choosing the encoding the way a browser does.
+
+    Checks a byte order mark, then the Content-Type charset, then <meta>
+    declarations in the first CHARSET_PRESCAN_BYTES. Failing those, the body is
+    decoded as strict UTF-8, and only if that fails is the encoding guessed from
+    the first CHARSET_DETECT_BYTES.
+
+    Args:
+        body: Response body as bytes
+        content_type: Content-Type header of the response
+
+    Returns:
+        tuple: (text, encoding, where the encoding came from)
+    """
+    for bom, encoding in ((codecs.BOM_UTF8, 'utf-8-sig'), (codecs.BOM_UTF16_LE, 'utf-16'),
+                          (codecs.BOM_UTF16_BE, 'utf-16')):
+        if body.startswith(bom):
+            return body.decode(encoding, errors='replace'), encoding, 'byte order mark'
+
+    encoding, source = None, None
+    if 'charset=' in content_type.lower():
+        param = CHARSET_PARAM_PATTERN.search(content_type.encode('latin-1', errors='ignore'))
+        encoding = lookup_encoding(param.group(1)) if param else None
+        source = 'headers'
+    if not encoding:
+        encoding, source = prescan_meta_charset(body[:CHARSET_PRESCAN_BYTES]), 'meta tag'
+    if encoding:
+        return body.decode(encoding, errors='replace'), encoding, source
+
+    try:
+        return body.decode('utf-8'), 'utf-8', 'valid UTF-8'
+    except UnicodeDecodeError:
+        pass
+    detected = requests.compat.chardet.detect(body[:CHARSET_DETECT_BYTES]).get('encoding')
+    encoding = lookup_encoding(detected) if detected else None
+    if encoding:
+        return body.decode(encoding, errors='replace'), encoding, 'detection'
+    return body.decode('utf-8', errors='replace'), 'utf-8', 'default'
+
+def evict_lru_entries(directory, max_bytes, data_suffix):
+    """
+    Delete the least recently used entries in a cache directory until it fits in max_bytes.
+
+    Each entry is a `<key>.json` metadata file plus a `<key><data_suffix>` data
+    file. The metadata file is touched on every use, so its mtime orders the
+    entries by recency.
+
+    Returns:
+        int: Total size of the remaining entries in bytes
+    """
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return 0
+    entries = []
+    total = 0
+    for name in names:
+        if not name.endswith('.json'):
+            continue
+        meta_path = os.path.join(directory, name)
+        data_path = meta_path[:-len('.json')] + data_suffix
+        try:
+            size = os.path.getsize(meta_path) + os.path.getsize(data_path)
+            entries.append((os.path.getmtime(meta_path), size, meta_path, data_path))
+            total += size
+        except OSError:
+            continue
+    entries.sort()
+    for _, size, meta_path, data_path in entries:
+        if total <= max_bytes:
+            break
+        for path in (meta_path, data_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        total -= size
+    return total
+
+class HTTPCache:
+    """
+    Persistent on-disk cache for asset responses.
+
+    Successful GET responses are stored with their headers. Entries are served
+    straight from disk while fresh according to Cache-Control max-age (or
+    Expires), and revalidated with If-None-Match / If-Modified-Since once stale.
+    Requests sent with cookies or an Authorization header bypass the cache, as
+    do responses that vary on anything but Accept-Encoding and responses that
+    are neither fresh nor revalidatable. The cache is capped at `max_bytes`;
+    the least recently used entries are evicted first.
+
+    Args:
+        directory: Directory holding the cache files
+        max_bytes: Maximum total size of the cache on disk
+    """
+    # Headers that describe the transfer rather than the cached body
+    SKIPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'set-cookie'}
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._total_bytes = None
+        self._lock = threading.Lock()
+
+    def _paths(self, url):
+        key = hashlib.sha256(normalize_url(url).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key + '.json'), os.path.join(self.directory, key + '.body')
+
+    def _count(self, stats, name):
+        if stats is not None:
+            with self._lock:
+                stats[name] = stats.get(name, 0) + 1
+
+    @staticmethod
+    def _freshness_lifetime(headers):
+        """Return how many seconds a response stays fresh, or None if it must not be stored"""
+        directives = {}
+        for part in headers.get('Cache-Control', '').lower().split(','):
+            name, _, value = part.strip().partition('=')
+            if name:
+                directives[name] = value.strip('"')
+        if 'no-store' in directives or 'private' in directives:
+            return None
+        # The stored body is decoded, so only Accept-Encoding may select it
+        if any(name.strip() not in ('', 'accept-encoding') for name in headers.get('Vary', '').lower().split(',')):
+            return None
+        if 'no-cache' in directives:
+            return 0
+        if directives.get('max-age', '').isdigit():
+            return int(directives['max-age'])
+        if headers.get('Expires'):
+            try:
+                expires = parsedate_to_datetime(headers['Expires'])
+                date = parsedate_to_datetime(headers['Date']) if headers.get('Date') else datetime.now(expires.tzinfo)
+                return max(0, int((expires - date).total_seconds()))
+            except (TypeError, ValueError):
+                return 0
+        return 0
+
+    def _load(self, url):
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None, None
+        if not os.path.exists(body_path):
+            return None, None
+        return meta, body_path
+
+    def _save(self, url, response, lifetime, body_file):
+        meta_path, body_path = self._paths(url)
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in self.SKIPPED_HEADERS}
+        meta = {
+            'url': url,
+            'final_url': response.url,
+            'headers': headers,
+            'stored_at': time.time() - self._age(response.headers),
+            'lifetime': lifetime,
+        }
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            old_size = sum(os.path.getsize(p) for p in (meta_path, body_path) if os.path.exists(p))
+            self._write_atomic(body_path, body_file)
+            self._write_atomic(meta_path, BytesIO(json.dumps(meta).encode('utf-8')))
+            new_size = os.path.getsize(body_path) + os.path.getsize(meta_path)
+        except OSError as e:
+            print(f"Error writing HTTP cache entry for {url}: {str(e)}")
+            return
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes += new_size - old_size
+        self._evict()
+
+    @staticmethod
+    def _write_atomic(path, source):
+        """Write a file through a temp file so readers never see a partial entry"""
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                shutil.copyfileobj(source, f, STREAM_CHUNK_BYTES)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _refresh(self, url, meta, headers):
+        """Update a revalidated entry with the headers of the 304 response"""
+        meta['headers'].update({k: v for k, v in headers.items() if k.lower() not in self.SKIPPED_HEADERS})
+        meta['stored_at'] = time.time() - self._age(headers)
+        lifetime = self._freshness_lifetime(meta['headers'])
+        meta['lifetime'] = lifetime or 0
+        meta_path, _ = self._paths(url)
+        try:
+            self._write_atomic(meta_path, BytesIO(json.dumps(meta).encode('utf-8')))
+        except OSError as e:
+            print(f"Error updating HTTP cache entry for {url}: {str(e)}")
+
+    @staticmethod
+    def _sends_credentials(session_obj, url, headers):
+        """Return True if a request for the URL would carry cookies or an Authorization header"""
+        if getattr(session_obj, 'auth', None):
+            return True
+        for name in list(headers) + list(getattr(session_obj, 'headers', None) or {}):
+            if name.lower() in ('authorization', 'cookie'):
+                return True
+        cookies = getattr(session_obj, 'cookies', None)
+        return bool(cookies) and bool(get_cookie_header(cookies, requests.Request('GET', url)))
+
+    @staticmethod
+    def _age(headers):
+        age = headers.get('Age', '')
+        return int(age) if age.isdigit() else 0
+
+    def _evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        with self._lock:
+            if self._total_bytes is not None and self._total_bytes <= self.max_bytes:
+                return
+            self._total_bytes = evict_lru_entries(self.directory, self.max_bytes, '.body')
+
+    @staticmethod
+    def _to_response(url, meta, body_path):
+        # The body is streamed from disk like a network response
+        response = requests.Response()
+        response.status_code = 200
+        response.raw = open(body_path, 'rb')
+        response.from_cache = True
+        response.headers = CaseInsensitiveDict(meta['headers'])
+        response.url = meta.get('final_url') or url
+        response.encoding = get_encoding_from_headers(response.headers)
+        return response
+
+    def _touch(self, url):
+        try:
+            os.utime(self._paths(url)[0])
+        except OSError:
+            pass
+
+    def get(self, session_obj, url, headers=None, stats=None, **kwargs):
+        """
+        Cached replacement for session_obj.get(url, headers=headers, **kwargs).
+
+        Args:
+            session_obj: requests.Session (or the requests module) used on a cache miss
+            url: URL to fetch
+            headers: Request headers
+            stats: Optional dict receiving cache_hits / cache_misses / cache_revalidated counters
+
+        Returns:
+            requests.Response, either from the network or rebuilt from the cache.
+            Network responses are returned unread; pass them to store() once the
+            body has been read so they can be cached.
+        """
+        request_headers = dict(headers or {})
+        if self._sends_credentials(session_obj, url, request_headers):
+            # The response may be personalized; store() won't keep it either
+            self._count(stats, 'cache_misses')
+            return rate_limited_get(session_obj, url, headers=request_headers, **kwargs)
+
+        meta, body_path = self._load(url)
+        if meta is not None:
+            if time.time() - meta['stored_at'] < meta['lifetime']:
+                self._touch(url)
+                self._count(stats, 'cache_hits')
+                return self._to_response(url, meta, body_path)
+            # Stale: ask the origin whether our copy is still valid
+            if meta['headers'].get('ETag'):
+                request_headers['If-None-Match'] = meta['headers']['ETag']
+            if meta['headers'].get('Last-Modified'):
+                request_headers['If-Modified-Since'] = meta['headers']['Last-Modified']
+
+        response = rate_limited_get(session_obj, url, headers=request_headers, **kwargs)
+
+        if response.status_code == 304 and meta is not None:
+            response.close()
+            self._refresh(url, meta, response.headers)
+            self._touch(url)
+            self._count(stats, 'cache_revalidated')
+            return self._to_response(url, meta, body_path)
+
+        self._count(stats, 'cache_misses')
+        return response
+
+    def store(self, url, response, entry):
+        """
+        Cache a response returned by get() after its body has been read.
+
+        Args:
+            url: URL that was requested
+            response: The requests.Response
+            entry: Content store entry holding the body (see stream_response_body)
+        """
+        if getattr(response, 'from_cache', False) or response.status_code != 200:
+            return
+        request = getattr(response, 'request', None)
+        if request is not None and ('Cookie' in request.headers or 'Authorization' in request.headers):
+            return
+        lifetime = self._freshness_lifetime(response.headers)
+        if lifetime is None or entry['size'] > self.max_bytes // 4:
+            return
+        if not lifetime and not (response.headers.get('ETag') or response.headers.get('Last-Modified')):
+            return  # Stale on arrival and can't be revalidated
+        with open_body(entry) as body_file:
+            self._save(url, response, lifetime, body_file)
+
+HTTP_CACHE = HTTPCache(HTTP_CACHE_DIR, HTTP_CACHE_MAX_BYTES)
+
+class HostSkippedError(Exception):
+    """Raised when a fetch is skipped because its host's circuit breaker is open"""
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker for a single job.
+
+    After `threshold` consecutive failed attempts against a host the circuit
+    opens, and every remaining fetch for that host is skipped for the rest of
+    the job instead of paying for more timeouts.
+
+    Args:
+        threshold: Consecutive failures that open the circuit
+    """
+    def __init__(self, threshold=CIRCUIT_BREAKER_THRESHOLD):
+        self.threshold = threshold
+        self._failures = {}
+        self._open = set()
+        self._lock = threading.Lock()
+
+    def allow(self, url):
+        """Return False if the URL's host has been cut off"""
+        with self._lock:
+            return urlparse(url).netloc.lower() not in self._open
+
+    def record(self, url, success):
+        """Record the outcome of one attempt against the URL's host"""
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            if success:
+                self._failures[host] = 0
+                return
+            self._failures[host] = self._failures.get(host, 0) + 1
+            if self._failures[host] >= self.threshold and host not in self._open:
+                self._open.add(host)
+                print(f"Circuit opened for {host} after {self._failures[host]} consecutive failures")
+
+    def trip(self, url, reason):
+        """Open the circuit for the URL's host right away"""
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            if host not in self._open:
+                self._open.add(host)
+                print(f"Circuit opened for {host}: {reason}")
+
+    @property
+    def open_hosts(self):
+        with self._lock:
+            return sorted(self._open)
+
+class RetryBudget:
+    """
+    Caps the time a job spends on retries at a share of its total running time.
+
+    Args:
+        share: Fraction of the job's elapsed time that retries may use
+        min_seconds: Retry time always allowed, so early failures can still be retried
+    """
+    def __init__(self, share=RETRY_BUDGET_SHARE, min_seconds=RETRY_BUDGET_MIN_SECONDS):
+        self.share = share
+        self.min_seconds = min_seconds
+        self.spent = 0.0
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Return True if another retry still fits in the budget"""
+        with self._lock:
+            elapsed = time.monotonic() - self._started
+            return self.spent < max(self.min_seconds, self.share * elapsed)
+
+    def charge(self, seconds):
+        """Record time spent waiting for or performing a retry"""
+        with self._lock:
+            self.spent += seconds
+
+class ContentStore:
+    """
+    Per-job store of fetched responses, keyed by normalized URL.
+
+    Every extraction stage reads through the store, so a URL is downloaded at
+    most once per job. Concurrent requests for a URL that is already being
+    fetched wait for that fetch instead of starting another one.
+
+    Bodies are streamed in chunks. Small ones are kept in memory, larger ones
+    are spooled to a per-job temp directory that close() removes. Downloads are
+    aborted as soon as they exceed `max_asset_bytes`, or once the job has
+    downloaded `max_job_bytes` in total.
+
+    Timeouts, connection errors, 429 and 5xx responses are retried up to
+    `max_retries` times with jittered backoff, as long as the job's retry
+    budget allows. A per-host circuit breaker skips hosts that keep failing
+    or ask for a Retry-After pause longer than RATE_LIMIT_MAX_PAUSE;
+    skipped URLs are listed in `skipped`.
+
+    Args:
+        session_obj: requests.Session used for fetching
+        headers: Headers sent with every request
+        timeout: Request timeout in seconds
+        max_asset_bytes: Size limit for a single body (0 for no limit)
+        max_job_bytes: Size limit for all bodies fetched by the job (0 for no limit)
+        max_retries: Retries per URL after the first attempt
+    """
+    def __init__(self, session_obj, headers=None, timeout=10,
+                 max_asset_bytes=ASSET_MAX_BYTES, max_job_bytes=JOB_MAX_BYTES, max_retries=FETCH_MAX_RETRIES):
+        self.session_obj = session_obj
+        self.headers = headers
+        self.timeout = timeout
+        self.max_asset_bytes = max_asset_bytes
+        self.max_job_bytes = max_job_bytes
+        self.max_retries = max_retries
+        self.breaker = CircuitBreaker()
+        self.retry_budget = RetryBudget()
+        self.skipped = []
+        self.blocked = []
+        self.stats = {'requests': 0, 'fetches': 0, 'merged': 0, 'bytes': 0, 'retries': 0, 'seeded': 0,
+                      'cache_hits': 0, 'cache_misses': 0, 'cache_revalidated': 0}
+        self._entries = {}
+        self._inflight = {}
+        self._spool_dir = None
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        """
+        Return the entry for a URL, fetching it on first use.
+
+        Returns:
+            dict: body, headers, status and final_url of the response, plus an
+            error message if the request failed (status is then None)
+        """
+        key = normalize_url(url)
+        with self._lock:
+            self.stats['requests'] += 1
+            entry = self._entries.get(key)
+            if entry is not None:
+                return entry
+            event = self._inflight.get(key)
+            is_owner = event is None
+            if is_owner:
+                event = self._inflight[key] = threading.Event()
+            else:
+                self.stats['merged'] += 1
+
+        if not is_owner:
+            event.wait()
+            return self._entries[key]
+
+        try:
+            entry = self._fetch(url)
+        except Exception as e:
+            if isinstance(e, HostSkippedError):
+                with self._lock:
+                    self.skipped.append(url)
+            entry = {'body': None, 'body_path': None, 'size': 0, 'sha256': None,
+                     'headers': {}, 'status': None, 'final_url': url, 'error': str(e)}
+        with self._lock:
+            self._entries[key] = entry
+            del self._inflight[key]
+        event.set()
+        return entry
+
+    def _get_with_retries(self, url):
+        """Request a URL, retrying transient failures within the breaker and budget limits"""
+        attempt = 0
+        while True:
+            if not self.breaker.allow(url):
+                raise HostSkippedError(f"Skipped {url}: too many failures on {urlparse(url).netloc}")
+            started = time.monotonic()
+            try:
+                response = HTTP_CACHE.get(
+                    self.session_obj,
+                    url,
+                    headers=self.headers,
+                    stats=self.stats,
+                    timeout=self.timeout,
+                    stream=True,
+                    verify=False  # Ignore SSL certificate errors
+                )
+                error = None
+                if response.status_code != 429 and response.status_code < 500:
+                    self.breaker.record(url, True)
+                    return response
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                response, error = None, e
+            self.breaker.record(url, False)
+            if attempt > 0:
+                self.retry_budget.charge(time.monotonic() - started)
+
+            retry_after = parse_retry_after(response.headers.get('Retry-After')) if response is not None else None
+            if retry_after is not None and retry_after > RATE_LIMIT_MAX_PAUSE:
+                # Waiting that long would stall the job, skip the host instead
+                self.breaker.trip(url, f"Retry-After of {retry_after:g}s")
+                return response
+
+            if attempt >= self.max_retries or not self.retry_budget.allow() or not self.breaker.allow(url):
+                if error is not None:
+                    raise error
+                return response  # Give up and keep the failed response
+            if response is not None:
+                response.close()
+
+            delay = backoff_delay(attempt)
+            time.sleep(delay)
+            self.retry_budget.charge(delay)
+            attempt += 1
+            with self._lock:
+                self.stats['retries'] += 1
+
+    def _consume(self, size):
+        """Charge downloaded bytes against the job limit"""
+        with self._lock:
+            self.stats['bytes'] += size
+            if self.max_job_bytes and self.stats['bytes'] > self.max_job_bytes:
+                raise AssetTooLargeError(f"Job download limit of {self.max_job_bytes} bytes reached")
+
+    def _get_spool_dir(self):
+        with self._lock:
+            if self._spool_dir is None:
+                self._spool_dir = tempfile.mkdtemp(prefix='website_extractor_job_')
+            return self._spool_dir
+
+    def _fetch(self, url):
+        with self._lock:
+            self.stats['fetches'] += 1
+            if self.max_job_bytes and self.stats['bytes'] >= self.max_job_bytes:
+                raise AssetTooLargeError(f"Job download limit of {self.max_job_bytes} bytes reached")
+        response = self._get_with_retries(url)
+        entry = {
+            'body': b'',
+            'body_path': None,
+            'size': 0,
+            'sha256': None,
+            'headers': response.headers,
+            'status': response.status_code,
+            'final_url': response.url,
+            'error': None
+        }
+        if response.status_code != 200:
+            response.close()
+            return entry
+        entry.update(stream_response_body(
+            response,
+            max_bytes=self.max_asset_bytes,
+            consume=self._consume,
+            spool_dir=self._get_spool_dir()
+        ))
+        HTTP_CACHE.store(url, response, entry)
+        return entry
+
+    def block(self, urls):
+        """
+        Mark URLs the Selenium browser was not allowed to load; they are not fetched.
+
+        Args:
+            urls: Blocked URLs
+        """
+        with self._lock:
+            for url in urls:
+                key = normalize_url(url)
+                if key in self._entries or key in self._inflight:
+                    continue
+                self._entries[key] = {'body': None, 'body_path': None, 'size': 0, 'sha256': None, 'headers': {},
+                                      'status': None, 'final_url': url, 'error': 'Blocked during the Selenium render'}
+                self.blocked.append(url)
+
+    def seed(self, url, status, headers, body):
+        """
+        Add a response that was downloaded elsewhere, such as by the Selenium browser.
+
+        URLs the store already has or is fetching are left alone. The body
+        counts against the same size limits as a download.
+
+        Args:
+            url: URL of the response
+            status: HTTP status code
+            headers: Response headers
+            body: Response body as bytes
+
+        Returns:
+            bool: True if the entry was added
+        """
+        key = normalize_url(url)
+        with self._lock:
+            if key in self._entries or key in self._inflight:
+                return False
+        if self.max_asset_bytes and len(body) > self.max_asset_bytes:
+            return False
+        try:
+            self._consume(len(body))
+        except AssetTooLargeError:
+            return False
+        entry = {'body': body, 'body_path': None, 'size': len(body), 'sha256': hashlib.sha256(body).hexdigest(),
+                 'headers': headers, 'status': status, 'final_url': url, 'error': None}
+        if len(body) > STREAM_INLINE_BYTES:
+            fd, body_path = tempfile.mkstemp(dir=self._get_spool_dir(), suffix='.body')
+            with os.fdopen(fd, 'wb') as spool:
+                spool.write(body)
+            entry.update(body=None, body_path=body_path)
+        with self._lock:
+            if key in self._entries or key in self._inflight:
+                if entry['body_path']:
+                    os.remove(entry['body_path'])
+                return False
+            self._entries[key] = entry
+            self.stats['seeded'] += 1
+        return True
+
+    def close(self):
+        """Remove bodies spooled to disk by this job"""
+        with self._lock:
+            spool_dir, self._spool_dir = self._spool_dir, None
+        if spool_dir:
+            shutil.rmtree(spool_dir, ignore_errors=True)
+
+# Asset bucket by the file extension of the URL path
+ASSET_EXTENSION_TYPES = {
+    **dict.fromkeys(('.css', '.scss', '.less', '.sass'), 'css'),
+    **dict.fromkeys(('.js', '.jsx', '.mjs', '.ts', '.tsx', '.cjs'), 'js'),
+    **dict.fromkeys(('.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp', '.avif', '.bmp', '.ico'), 'img'),
+    **dict.fromkeys(('.woff', '.woff2', '.ttf', '.otf', '.eot'), 'fonts'),
+    **dict.fromkeys(('.mp4', '.webm', '.ogg', '.avi', '.mov', '.flv'), 'videos'),
+    **dict.fromkeys(('.mp3', '.wav', '.aac'), 'audio'),
+    '.icon': 'favicons',
+}
+
+# Asset bucket by host, for services whose URLs carry no extension
+ASSET_HOST_TYPES = {
+    'fonts.googleapis.com': 'css',
+    'fonts.gstatic.com': 'fonts',
+}
+
+# Rules for URLs without a known extension, checked in order against the
+# lowercased URL: (asset type, substrings that must all occur, substrings of
+# which one must occur)
+ASSET_URL_RULES = [
+    # Framework-specific patterns
+    ('css', ('_next/static',), ('.css', 'styles')),
+    ('js', ('_next/static',), ()),  # Default to JS for Next.js assets
+    ('js', (), ('chunk.', 'webpack')),  # Webpack chunks
+    ('js', ('angular', '.js'), ()),  # Angular bundles
+    ('css', (), ('global.css', 'globals.css', 'tailwind')),
+    ('css', ('styles', '.css'), ()),
+    ('js', (), ('bundle.js', 'main.js', 'app.js', 'polyfill', 'runtime', 'vendor', 'image-config', 'image.config')),
+    ('img', (), ('/images/', '/img/', '/assets/images/')),
+    ('fonts', (), ('/fonts/', 'font-awesome')),
+    ('favicons', (), ('favicon',)),
+    ('js', (), ('graphql', 'api.')),  # Special API endpoints
+    # Try to guess based on URL structure
+    ('css', (), ('/css/',)),
+    ('js', (), ('/js/', '/scripts/')),
+    ('css', ('/static/', 'style'), ()),
+    ('js', ('/static/',), ()),
+    # CDN resources: guess from the library name
+    ('js', ('cdn.jsdelivr.net',), ('react', 'angular', 'vue', 'jquery')),
+    ('js', ('unpkg.com',), ('react', 'angular', 'vue', 'jquery')),
+    ('js', ('cdnjs.cloudflare.com',), ('react', 'angular', 'vue', 'jquery')),
+    ('css', ('cdn.jsdelivr.net',), ('bootstrap', 'tailwind', 'material', 'font')),
+    ('css', ('unpkg.com',), ('bootstrap', 'tailwind', 'material', 'font')),
+    ('css', ('cdnjs.cloudflare.com',), ('bootstrap', 'tailwind', 'material', 'font')),
+]
+
 def get_asset_type(url):
-    """Determine the type of asset from the URL"""
+    """
+    Determine the type of asset from the URL.
+
+    Unrecognized URLs land in 'js'; create_zip_file corrects the bucket from
+    the Content-Type or the body once the asset has been downloaded.
+    """
     # Handle empty or None URLs
     if not url:
         return 'other'
-    
-    url_lower = url.lower()
-    
-    # Framework-specific patterns
-    if '_next/static' in url_lower:
-        if '.css' in url_lower or 'styles' in url_lower:
-            return 'css'
-        return 'js'  # Default to JS for Next.js assets
-        
-    if 'chunk.' in url_lower or 'webpack' in url_lower:
-        return 'js'  # Webpack chunks
-        
-    if 'angular' in url_lower and '.js' in url_lower:
-        return 'js'  # Angular bundles
-        
-    # Handle CSS files
-    if url_lower.endswith(('.css', '.scss', '.less', '.sass')):
-        return 'css'
-    if 'global.css' in url_lower or 'globals.css' in url_lower or 'tailwind' in url_lower:
-        return 'css'
-    if 'fonts.googleapis.com' in url_lower:
-        return 'css'
-    if 'styles' in url_lower and '.css' in url_lower:
-        return 'css'
-        
-    # Handle JS files
-    if url_lower.endswith(('.js', '.jsx', '.mjs', '.ts', '.tsx', '.cjs')):
-        return 'js'
-    if 'bundle.js' in url_lower or 'main.js' in url_lower or 'app.js' in url_lower:
-        return 'js'
-    if 'polyfill' in url_lower or 'runtime' in url_lower or 'vendor' in url_lower:
-        return 'js'
-    if 'image-config' in url_lower or 'image.config' in url_lower:
-        return 'js'
-        
-    # Handle image files
-    if url_lower.endswith(('.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp', '.avif', '.bmp', '.ico')):
-        return 'img'
-    if '/images/' in url_lower or '/img/' in url_lower or '/assets/images/' in url_lower:
-        return 'img'
-        
-    # Handle font files
-    if url_lower.endswith(('.woff', '.woff2', '.ttf', '.otf', '.eot')):
-        return 'fonts'
-    if '/fonts/' in url_lower or 'font-awesome' in url_lower:
-        return 'fonts'
-        
-    # Handle media files
-    if url_lower.endswith(('.mp4', '.webm', '.ogg', '.avi', '.mov', '.flv')):
-        return 'videos'
-    if url_lower.endswith(('.mp3', '.wav', '.ogg', '.aac')):
-        return 'audio'
-        
-    # Handle favicon
-    if url_lower.endswith(('.ico', '.icon')):
-        return 'favicons'
-    if 'favicon' in url_lower:
-        return 'favicons'
-        
-    # Handle special API endpoints
-    if 'graphql' in url_lower or 'api.' in url_lower:
-        return 'js'
-        
-    # Try to guess based on URL structure
-    if '/css/' in url_lower:
-        return 'css'
-    if '/js/' in url_lower or '/scripts/' in url_lower:
-        return 'js'
-    if '/static/' in url_lower and not any(ext in url_lower for ext in ['.css', '.js', '.png', '.jpg']):
-        # For static assets with unclear type, check the URL itself
-        if 'style' in url_lower:
-            return 'css'
-        return 'js'  # Default for static assets
-        
-    # For CDN resources, try to determine type from the host
-    cdn_hosts = ['cdn.jsdelivr.net', 'unpkg.com', 'cdnjs.cloudflare.com']
-    for host in cdn_hosts:
-        if host in url_lower:
-            if any(lib in url_lower for lib in ['react', 'angular', 'vue', 'jquery']):
-                return 'js'
-            if any(lib in url_lower for lib in ['bootstrap', 'tailwind', 'material', 'font']):
-                return 'css'
-    
+    return classify_asset_url(url.split('#', 1)[0].lower())
+
+@lru_cache(maxsize=16384)
+def classify_asset_url(url_lower):
+    """Classify a lowercased URL without fragment (cached, pages repeat URLs a lot)"""
+    scheme, sep, rest = url_lower.partition('//')
+    host, _, path = (rest if sep else scheme).partition('/')
+    name = path.split('?', 1)[0].rsplit('/', 1)[-1]
+    dot = name.rfind('.')
+    if dot >= 0:
+        asset_type = ASSET_EXTENSION_TYPES.get(name[dot:])
+        if asset_type:
+            return asset_type
+    asset_type = ASSET_HOST_TYPES.get(host)
+    if asset_type:
+        return asset_type
+    for asset_type, required, any_of in ASSET_URL_RULES:
+        for part in required:
+            if part not in url_lower:
+                break
+        else:
+            if not any_of:
+                return asset_type
+            for part in any_of:
+                if part in url_lower:
+                    return asset_type
     # Default to JS for unknown extensions
     return 'js'
 
-def extract_metadata(soup, base_url):
-    """Extract metadata from the HTML"""
-    metadata = {
-        'title': '',
-        'description': '',
-        'keywords': '',
-        'og_tags': {},
-        'twitter_cards': {},
-        'canonical': '',
-        'language': '',
-        'favicon': '',
-        'structured_data': []
-    }
-    
-    # Extract title
-    title_tag = soup.find('title')
-    if title_tag and title_tag.string:
-        metadata['title'] = title_tag.string.strip()
-    
-    # Extract meta tags
-    meta_tags = soup.find_all('meta')
-    for tag in meta_tags:
-        # Description
-        if tag.get('name') == 'description' and tag.get('content'):
-            metadata['description'] = tag.get('content').strip()
-        
-        # Keywords
+# Asset bucket by MIME type; image/, font/, video/ and audio/ types go by prefix
+CONTENT_TYPE_ASSET_TYPES = {
+    'text/css': 'css',
+    **dict.fromkeys(('text/javascript', 'application/javascript', 'application/x-javascript',
+                     'application/ecmascript', 'text/ecmascript'), 'js'),
+    **dict.fromkeys(('application/font-woff', 'application/font-woff2', 'application/x-font-woff',
+                     'application/x-font-ttf', 'application/x-font-otf', 'application/font-sfnt',
+                     'application/vnd.ms-fontobject'), 'fonts'),
+}
+CONTENT_TYPE_PREFIX_ASSET_TYPES = [('image/', 'img'), ('font/', 'fonts'), ('video/', 'videos'), ('audio/', 'audio')]
+
+# Magic bytes as (offset, signature, asset type), used when the server sends
+# no useful Content-Type. Longer signatures come before their prefixes.
+ASSET_SIGNATURES = [
+    (0, b'\x89PNG\r\n\x1a\n', 'img'),
+    (0, b'\xff\xd8\xff', 'img'),         # JPEG
+    (0, b'GIF8', 'img'),
+    (0, b'\x00\x00\x01\x00', 'img'),     # ICO
+    (4, b'ftypavif', 'img'),
+    (4, b'ftypheic', 'img'),
+    (4, b'ftyp', 'videos'),              # MP4 / MOV
+    (0, b'wOFF', 'fonts'),
+    (0, b'wOF2', 'fonts'),
+    (0, b'OTTO', 'fonts'),
+    (0, b'\x00\x01\x00\x00', 'fonts'),   # TrueType
+    (0, b'\x1aE\xdf\xa3', 'videos'),     # WebM / Matroska
+    (0, b'ID3', 'audio'),                # MP3 with ID3 tag
+    (0, b'fLaC', 'audio'),
+]
+RIFF_ASSET_TYPES = {b'WEBP': 'img', b'WAVE': 'audio', b'AVI ': 'videos'}
+
+def detect_asset_type(content_type, head, provisional):
+    """
+    Correct an asset's bucket from its Content-Type or first bytes after download.
+
+    Only media, font, stylesheet and script types move an asset. HTML, JSON
+    and unknown responses keep the bucket chosen from the URL, and so do
+    images that were filed as favicons.
+
+    Args:
+        content_type: Content-Type header of the response
+        head: First bytes of the body
+        provisional: Bucket chosen from the URL by get_asset_type
+
+    Returns:
+        str: The asset type to file the download under
+    """
+    mime = (content_type or '').split(';')[0].strip().lower()
+    detected = CONTENT_TYPE_ASSET_TYPES.get(mime)
+    if not detected:
+        for prefix, asset_type in CONTENT_TYPE_PREFIX_ASSET_TYPES:
+            if mime.startswith(prefix):
+                detected = asset_type
+                break
+    if not detected and mime in ('', 'application/octet-stream', 'binary/octet-stream'):
+        if head[:4] == b'RIFF':
+            detected = RIFF_ASSET_TYPES.get(head[8:12])
+        else:
+            for offset, signature, asset_type in ASSET_SIGNATURES:
+                if head[offset:offset + len(signature)] == signature:
+                    detected = asset_type
+                    break
+    if not detected or (provisional == 'favicons' and detected == 'img'):
+        return provisional
+    return detected
+
+def html_parser_backends(preferred=None):
+    """
+    List the installed BeautifulSoup parsers to try for a page, in order.
+
+    'auto' prefers lxml, then html.parser, then html5lib. Naming a parser puts
+    it first and keeps the others as fallbacks; the default is html.parser,
+    which keeps the markup recovery and output of earlier releases. Parsers that are not installed
+    are left out, so html.parser (part of the standard library) is always there.
+
+    Args:
+        preferred: Parser name or 'auto' (defaults to HTML_PARSER_BACKEND)
+
+    Returns:
+        list: Parser names to try
+    """
+    preferred = preferred or HTML_PARSER_BACKEND
+    order = ['lxml', 'html.parser', 'html5lib']
+    if preferred in order:
+        order.remove(preferred)
+        order.insert(0, preferred)
+    elif preferred != 'auto':
+        print(f"Warning: Unknown HTML parser backend '{preferred}', using auto")
+    return [name for name in order if builder_registry.lookup(name) is not None]
+
+class ParsedDocument:
+    """
+    An HTML page parsed once and shared by every extraction stage.
+
+    The tree is built lazily on first access to `soup`. Stages that modify it
+    (such as fix_relative_urls) work on this same tree, and serialize() turns
+    it back into markup once, at the end of the job. `parse_count`,
+    `parse_seconds` and `serialize_seconds` record the cost per job, and
+    `parser` names the backend that produced the tree.
+
+    Args:
+        html_content: Markup of the page
+        backend: Preferred parser (defaults to HTML_PARSER_BACKEND)
+    """
+    def __init__(self, html_content, backend=None):
+        self.html_content = html_content
+        self.backend = backend
+        self.parse_count = 0
+        self.parse_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.parser = None
+        self._soup = None
+        self._parsed = False
+
+    def _parse(self, parser):
+        started = time.perf_counter()
+        try:
+            return BeautifulSoup(self.html_content, parser)
+        finally:
+            self.parse_count += 1
+            self.parse_seconds += time.perf_counter() - started
+
+    @property
+    def soup(self):
+        """The shared BeautifulSoup tree, or None if the page could not be parsed."""
+        if not self._parsed:
+            self._parsed = True
+            for parser in html_parser_backends(self.backend):
+                try:
+                    soup = self._parse(parser)
+                except Exception as e:
+                    print(f"Warning: {parser} failed to parse the page: {str(e)}")
+                    continue
+                if soup and soup.html:
+                    self._soup = soup
+                    self.parser = parser
+                    break
+                print(f"Warning: Could not parse HTML content properly with {parser}")
+            else:
+                print("Error: Failed to parse HTML with any available parser")
+        return self._soup
+
+    def serialize(self):
+        """
+        Render the shared tree back into markup.
+
+        Returns:
+            str: The document, including changes made by earlier stages
+        """
+        if self.soup is None:
+            return self.html_content
+        started = time.perf_counter()
+        try:
+            return str(self.soup)
+        finally:
+            self.serialize_seconds += time.perf_counter() - started
+
+def extract_metadata(soup, base_url):
+    """Extract metadata from the HTML"""
+    metadata = {
+        'title': '',
+        'description': '',
+        'keywords': '',
+        'og_tags': {},
+        'twitter_cards': {},
+        'canonical': '',
+        'language': '',
+        'favicon': '',
+        'structured_data': []
+    }
+    
+    # Extract title
+    title_tag = soup.find('title')
+    if title_tag and title_tag.string:
+        metadata['title'] = title_tag.string.strip()
+    
+    # Extract meta tags
+    meta_tags = soup.find_all('meta')
+    for tag in meta_tags:
+        # Description
+        if tag.get('name') == 'description' and tag.get('content'):
+            metadata['description'] = tag.get('content').strip()
+        
+        # Keywords
         elif tag.get('name') == 'keywords' and tag.get('content'):
             metadata['keywords'] = tag.get('content').strip()
         
@@ -412,6 +1582,71 @@ def extract_metadata(soup, base_url):
     
     return metadata
 
+# Component kinds collected by extract_component_structure, in output order:
+# (kind, tag names, exact role values, class substrings, number kept)
+COMPONENT_RULES = [
+    ('navigation', ('nav',), ('navigation',), ('nav', 'menu'), 5),
+    ('header', ('header',), ('banner',), ('header',), 2),  # Usually only 1-2 headers per page
+    ('footer', ('footer',), ('contentinfo',), ('footer',), 2),
+    ('hero', (), (), ('hero', 'banner', 'jumbotron'), 3),
+    ('card', (), (), ('card', 'tile'), 5),
+    ('form', ('form',), (), ('form',), 3),
+    ('cta', (), (), ('cta', 'call-to-action'), 3),
+    ('sidebar', (), (), ('sidebar', 'side-bar'), 2),
+    ('modal', (), ('dialog',), ('modal', 'dialog', 'popup'), 3),
+    ('section', ('section',), ('region',), (), 5),
+    ('store', (), (), ('product', 'store', 'shop', 'pricing'), 5),
+    ('mobile', (), (), ('mobile', 'smartphone', 'mobile-only'), 3),
+    ('cart', (), (), ('cart', 'basket', 'shopping-cart'), 2),
+]
+
+# Digit runs in class names (grid sizes, generated suffixes) don't change the
+# structure of a component
+CLASS_DIGITS_PATTERN = re.compile(r'\d+')
+
+def structure_fingerprints(elements):
+    """
+    Compute structural fingerprints for a list of elements in one bottom-up pass.
+
+    An element's fingerprint hashes its tag name, the shape of its class set
+    (lowercased, digit runs collapsed, sorted) and the fingerprints of its
+    child elements in order. Text and other attributes are ignored, so
+    repeated components with different content get the same fingerprint.
+    Fingerprints are plain hashlib digests, stable across processes, which
+    makes them comparable between pages of the same site.
+
+    Args:
+        elements: Every element of a tree in document order, e.g. soup.find_all(True)
+
+    Returns:
+        tuple: ({id(element): fingerprint}, {id(element): number of descendant elements})
+    """
+    fingerprints = {}
+    sizes = {}
+    shapes = {}
+    # In reverse document order every element comes after all of its descendants
+    for element in reversed(elements):
+        classes = element.get('class') or ()
+        if isinstance(classes, str):
+            classes = (classes,)
+        else:
+            classes = tuple(classes)
+        shape = shapes.get(classes)
+        if shape is None:
+            shape = shapes[classes] = ' '.join(sorted({CLASS_DIGITS_PATTERN.sub('0', token.lower()) for token in classes}))
+
+        child_fingerprints = []
+        size = 0
+        for child in element.contents:
+            child_fingerprint = fingerprints.get(id(child))
+            if child_fingerprint is not None:  # Text nodes have no fingerprint
+                child_fingerprints.append(child_fingerprint)
+                size += sizes[id(child)] + 1
+        data = f"{element.name}|{shape}|{','.join(child_fingerprints)}"
+        fingerprints[id(element)] = hashlib.blake2b(data.encode('utf-8'), digest_size=8).hexdigest()
+        sizes[id(element)] = size
+    return fingerprints, sizes
+
 def get_component_type(element):
     """Determine the type of UI component based on element attributes and classes"""
     if not element:
@@ -491,134 +1726,72 @@ def extract_component_structure(soup):
     """Extract UI components from the HTML structure"""
     if not soup:
         return {}
-        
-    components = {
-        'navigation': [],
-        'header': [],
-        'footer': [],
-        'hero': [],
-        'card': [],
-        'form': [],
-        'cta': [],
-        'sidebar': [],
-        'modal': [],
-        'section': [],
-        'store': [],
-        'mobile': [],
-        'cart': []
-    }
-    
+
     # Helper function to convert element to HTML string
     def element_to_html(element):
         return str(element)
-    
-    # Extract navigation components
-    nav_elements = soup.find_all(['nav']) + soup.find_all(role='navigation') + soup.find_all(class_=lambda c: c and ('nav' in c.lower() or 'menu' in c.lower()))
-    for element in nav_elements[:5]:  # Limit to 5 to avoid excessive extraction
-        components['navigation'].append({
-            'html': element_to_html(element)
-        })
-    
-    # Extract header components
-    header_elements = soup.find_all(['header']) + soup.find_all(role='banner') + soup.find_all(class_=lambda c: c and 'header' in c.lower())
-    for element in header_elements[:2]:  # Usually only 1-2 headers per page
-        components['header'].append({
-            'html': element_to_html(element)
-        })
-    
-    # Extract footer components
-    footer_elements = soup.find_all(['footer']) + soup.find_all(role='contentinfo') + soup.find_all(class_=lambda c: c and 'footer' in c.lower())
-    for element in footer_elements[:2]:  # Usually only 1-2 footers per page
-        components['footer'].append({
-            'html': element_to_html(element)
-        })
-    
-    # Extract hero/banner components
-    hero_elements = soup.find_all(class_=lambda c: c and ('hero' in c.lower() or 'banner' in c.lower() or 'jumbotron' in c.lower()))
-    for element in hero_elements[:3]:  # Limit to 3
-        components['hero'].append({
-            'html': element_to_html(element)
-        })
-    
-    # Extract card components - often these are repeated elements
-    card_elements = soup.find_all(class_=lambda c: c and ('card' in c.lower() or 'tile' in c.lower()))
-    
-    # If we find many cards, just keep one of each unique structure
-    unique_cards = {}
-    for element in card_elements[:15]:  # Examine up to 15 cards
-        # Use a simplified structure hash to identify similar cards
-        structure_hash = str(len(element.find_all()))  # Number of child elements
-        if structure_hash not in unique_cards:
-            unique_cards[structure_hash] = element
-    
-    # Add unique cards to components
-    for idx, element in enumerate(unique_cards.values()):
-        if idx >= 5:  # Limit to 5 unique cards
-            break
-        components['card'].append({
-            'html': element_to_html(element)
-        })
-    
-    # Extract form components
-    form_elements = soup.find_all(['form']) + soup.find_all(class_=lambda c: c and 'form' in c.lower())
-    for element in form_elements[:3]:  # Limit to 3
-        components['form'].append({
-            'html': element_to_html(element)
-        })
-    
-    # Extract CTA components
-    cta_elements = soup.find_all(class_=lambda c: c and ('cta' in c.lower() or 'call-to-action' in c.lower()))
-    for element in cta_elements[:3]:  # Limit to 3
-        components['cta'].append({
-            'html': element_to_html(element)
-        })
-    
-    # Extract sidebar components
-    sidebar_elements = soup.find_all(class_=lambda c: c and ('sidebar' in c.lower() or 'side-bar' in c.lower()))
-    for element in sidebar_elements[:2]:  # Limit to 2
-        components['sidebar'].append({
-            'html': element_to_html(element)
-        })
-    
-    # Extract modal/dialog components
-    modal_elements = soup.find_all(role='dialog') + soup.find_all(class_=lambda c: c and ('modal' in c.lower() or 'dialog' in c.lower() or 'popup' in c.lower()))
-    for element in modal_elements[:3]:  # Limit to 3
-        components['modal'].append({
-            'html': element_to_html(element)
-        })
-    
-    # Extract section components
-    section_elements = soup.find_all(['section']) + soup.find_all(role='region')
-    # Filter to get only substantial sections
-    substantial_sections = [element for element in section_elements if len(element.find_all()) > 3]  # Must have at least 3 child elements
-    for element in substantial_sections[:5]:  # Limit to 5
-        components['section'].append({
-            'html': element_to_html(element)
-        })
-    
-    # Extract mobile-specific components
-    mobile_elements = soup.find_all(class_=lambda c: c and ('mobile' in c.lower() or 'smartphone' in c.lower() or 'mobile-only' in c.lower()))
-    for element in mobile_elements[:3]:  # Limit to 3
-        components['mobile'].append({
-            'html': element_to_html(element)
-        })
-    
-    # Extract store/product components
-    store_elements = soup.find_all(class_=lambda c: c and ('product' in c.lower() or 'store' in c.lower() or 'shop' in c.lower() or 'pricing' in c.lower()))
-    for element in store_elements[:5]:  # Limit to 5
-        components['store'].append({
-            'html': element_to_html(element)
-        })
-    
-    # Extract cart components
-    cart_elements = soup.find_all(class_=lambda c: c and ('cart' in c.lower() or 'basket' in c.lower() or 'shopping-cart' in c.lower()))
-    for element in cart_elements[:2]:  # Limit to 2
-        components['cart'].append({
-            'html': element_to_html(element)
-        })
-    
-    # Remove empty component types
-    return {k: v for k, v in components.items() if v}
+
+    elements = soup.find_all(True)
+    fingerprints, sizes = structure_fingerprints(elements)
+
+    # Index the tree in one pass: tag name and role map straight to component
+    # kinds, and each distinct class token is classified once and cached.
+    # Per kind, matches are kept in document order in three lists (by tag, by
+    # role, by class) which are concatenated in that order.
+    name_kinds, role_kinds = {}, {}
+    matches = {}
+    for kind, names, roles, class_parts, limit in COMPONENT_RULES:
+        for name in names:
+            name_kinds.setdefault(name, []).append(kind)
+        for role in roles:
+            role_kinds.setdefault(role, []).append(kind)
+        matches[kind] = ([], [], [])
+    token_kinds = {}
+
+    for element in elements:
+        for kind in name_kinds.get(element.name, ()):
+            matches[kind][0].append(element)
+
+        role = element.get('role')
+        if role:
+            for kind in role_kinds.get(role, ()):
+                matches[kind][1].append(element)
+
+        classes = element.get('class')
+        if classes:
+            if isinstance(classes, str):
+                classes = [classes]
+            kinds = []
+            for token in classes:
+                hits = token_kinds.get(token)
+                if hits is None:
+                    lowered = token.lower()
+                    hits = token_kinds[token] = [kind for kind, _, _, class_parts, _ in COMPONENT_RULES
+                                                 if any(part in lowered for part in class_parts)]
+                for kind in hits:
+                    if kind not in kinds:
+                        kinds.append(kind)
+            for kind in kinds:
+                matches[kind][2].append(element)
+
+    components = {}
+    for kind, names, roles, class_parts, limit in COMPONENT_RULES:
+        by_name, by_role, by_class = matches[kind]
+
+        # Keep the first element of each distinct structure
+        selected = {}
+        for element in by_name + by_role + by_class:
+            if kind == 'section' and sizes[id(element)] <= 3:
+                continue  # Only substantial sections (at least 3 child elements)
+            selected.setdefault(fingerprints[id(element)], element)
+            if len(selected) >= limit:
+                break
+
+        if selected:
+            components[kind] = [{'html': element_to_html(element), 'fingerprint': fingerprint}
+                                for fingerprint, element in selected.items()]
+
+    return components
 
 def extract_inline_styles(soup):
     """Extract all inline styles from the HTML"""
@@ -649,8 +1822,455 @@ def extract_inline_javascript(soup):
         return '\n\n/* --- INLINE SCRIPTS --- */\n\n'.join(inline_js)
     return ""
 
-def extract_assets(html_content, base_url, session_obj=None, headers=None):
-    """Extract all assets from HTML content"""
+# Fallback scan for asset URLs in raw HTML (inline scripts, JSON blobs and
+# attributes). Each quote style is matched on its own, so an apostrophe or an
+# empty string can't shift which quotes pair up. Values after loadCSS(,
+# loadJS( and _ASSET_PREFIX_= are taken as they are; any other quoted value
+# must start like a URL (/, //, http: or https:). Repeats are bounded and the
+# pattern has no nested quantifiers, so a scan is linear in the page size.
+ASSET_SCAN_PATTERN = re.compile(
+    r'(?P<call>loadCSS\(|loadJS\(|_ASSET_PREFIX_\s{0,16}=\s{0,16})'
+    r'(?:"(?P<call_double>[^"\n]{1,2048})"|\'(?P<call_single>[^\'\n]{1,2048})\')'
+    r'|(?P<attr>src=|href=)?'
+    r'(?:"(?P<double>(?:https?:)?/[^"\n<>]{0,2048})"|\'(?P<single>(?:https?:)?/[^\'\n<>]{0,2048})\')'
+)
+ASSET_SCAN_EXTENSIONS = ('.css', '.js', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.woff', '.woff2')
+FALLBACK_SCAN_SECONDS = float(os.environ.get('FALLBACK_SCAN_SECONDS', '2'))
+
+def scan_asset_urls(text, base_url, time_limit=FALLBACK_SCAN_SECONDS):
+    """
+    Find candidate asset URLs in raw HTML in one linear pass.
+
+    Picks up quoted absolute, protocol-relative and root-relative URLs that
+    end in a known asset extension, root-relative src= values, loadCSS()/
+    loadJS() arguments and the _ASSET_PREFIX_ value. The scan stops early
+    once `time_limit` seconds have passed.
+
+    Args:
+        text: Page markup
+        base_url: URL the page was fetched from
+        time_limit: Time cap in seconds (0 for no limit)
+
+    Returns:
+        list: Candidate URLs in page order
+    """
+    deadline = time.monotonic() + time_limit if time_limit else None
+    urls = []
+    for match in ASSET_SCAN_PATTERN.finditer(text):
+        if deadline and time.monotonic() > deadline:
+            print(f"Fallback URL scan stopped after {time_limit}s at offset {match.start()} of {len(text)}")
+            break
+
+        candidate = (match.group('call_double') or match.group('call_single')
+                     or match.group('double') or match.group('single'))
+        # Skip if it's clearly not a URL (likely JSON data)
+        if '{' in candidate or '}' in candidate:
+            continue
+
+        if match.group('call'):
+            pass
+        elif match.group('attr') == 'src=' and candidate.startswith('/'):
+            pass
+        elif not (candidate.startswith(('http://', 'https://', '/')) and candidate.endswith(ASSET_SCAN_EXTENSIONS)):
+            continue
+
+        if candidate.startswith('//'):
+            candidate = 'https:' + candidate
+        elif candidate.startswith('/'):
+            candidate = urljoin(base_url, candidate)
+        urls.append(candidate)
+    return urls
+
+# CSS tokens the stylesheet scan cares about, matched in one pass: @import
+# targets (quoted or url()), url() references and font-family declarations
+CSS_TOKEN_PATTERN = re.compile(
+    r'@import\s+(?:url\(\s*)?[\'"]?(?P<import>[^\'"\)\s;]+)'
+    r'|url\(\s*[\'"]?(?P<url>[^\'"\)\s]+)[\'"]?\s*\)'
+    r'|font-family:\s*[\'"]?(?P<family>[^\'";}]+)'
+)
+GENERIC_FONT_FAMILIES = ['serif', 'sans-serif', 'monospace', 'cursive', 'fantasy', 'system-ui']
+
+def strip_css_comments(css_content):
+    """Remove /* ... */ comments (an unterminated comment runs to the end)"""
+    parts = []
+    pos = 0
+    while True:
+        start = css_content.find('/*', pos)
+        if start < 0:
+            parts.append(css_content[pos:])
+            break
+        parts.append(css_content[pos:start])
+        end = css_content.find('*/', start + 2)
+        if end < 0:
+            break
+        pos = end + 2
+    return ''.join(parts)
+
+def parse_stylesheet(css_content, sheet_url):
+    """
+    Tokenize a stylesheet and resolve its references against the sheet URL.
+
+    Args:
+        css_content: Stylesheet text
+        sheet_url: URL the stylesheet was loaded from
+
+    Returns:
+        dict: 'imports' and 'references' (absolute URLs in source order) and
+            'font_families'
+    """
+    parsed = {'imports': [], 'references': [], 'font_families': []}
+    for match in CSS_TOKEN_PATTERN.finditer(strip_css_comments(css_content)):
+        target = match.group('import') or match.group('url')
+        if target:
+            if target.startswith(('data:', '#')):
+                continue
+            target = urljoin(sheet_url, target)
+            if not target.startswith(('http://', 'https://')):
+                continue
+            parsed['imports' if match.group('import') else 'references'].append(target)
+        else:
+            family = match.group('family').strip().split(',')[0].strip('\'"`')
+            if family and family.lower() not in GENERIC_FONT_FAMILIES:
+                parsed['font_families'].append(family)
+    return parsed
+
+def resolve_css_graph(css_urls, content_store, max_depth=CSS_IMPORT_MAX_DEPTH):
+    """
+    Fetch stylesheets and follow their @import chains concurrently.
+
+    Sheets are downloaded through the job's content store on an
+    AssetDownloader pool; each sheet's imports are queued as soon as it has
+    been parsed. Imports deeper than `max_depth` are listed in 'too_deep'
+    but not fetched, and an import of a sheet that is already on the import path is recorded
+    as a cycle instead of being followed.
+
+    Args:
+        css_urls: Stylesheet URLs linked from the page
+        content_store: ContentStore of the job
+        max_depth: Maximum @import nesting to follow (page links are depth 0)
+
+    Returns:
+        dict: 'sheets' maps each fetched sheet URL to its depth, imports,
+            references, fonts, images, font families and error; 'order' lists
+            sheets depth-first in source order; 'cycles' lists import paths
+            that lead back to themselves; 'too_deep' lists imports past
+            `max_depth`
+    """
+    graph = {'sheets': {}, 'order': [], 'cycles': [], 'too_deep': []}
+    seen = set()
+    downloader = AssetDownloader(content_store.get)
+
+    def queue(sheet_url, path):
+        key = normalize_url(sheet_url)
+        if key in path:
+            graph['cycles'].append([*path_urls[path], sheet_url])
+            return
+        if key in seen:
+            return
+        if len(path) > max_depth:
+            if sheet_url not in graph['too_deep']:
+                graph['too_deep'].append(sheet_url)
+            return
+        seen.add(key)
+        child_path = path + (key,)
+        path_urls[child_path] = [*path_urls[path], sheet_url]
+        downloader.submit(sheet_url, child_path)
+
+    path_urls = {(): []}
+    for css_url in css_urls:
+        if css_url and not css_url.startswith('data:'):
+            queue(css_url, ())
+
+    for sheet_url, path, entry, error in downloader.results():
+        sheet = {'depth': len(path) - 1, 'imports': [], 'references': [], 'fonts': [], 'images': [],
+                 'font_families': [], 'tailwind': False, 'error': None}
+        graph['sheets'][sheet_url] = sheet
+        if error is None and entry['error']:
+            error = entry['error']
+        elif error is None and entry['status'] != 200:
+            error = f"HTTP {entry['status']}"
+        if error is not None:
+            sheet['error'] = str(error)
+            continue
+
+        css_content = decode_body(entry)
+        sheet.update(parse_stylesheet(css_content, entry.get('final_url') or sheet_url))
+        for ref in sheet['references']:
+            asset_type = get_asset_type(ref)
+            if asset_type == 'fonts':
+                sheet['fonts'].append(ref)
+            elif asset_type == 'img':
+                sheet['images'].append(ref)
+        sheet['tailwind'] = 'tailwind' in css_content.lower() or '.tw-' in css_content
+        for import_url in sheet['imports']:
+            queue(import_url, path)
+
+    # Depth-first walk in source order, so results don't depend on download timing
+    def walk(sheet_url, visited):
+        key = normalize_url(sheet_url)
+        if key in visited:
+            return
+        visited.add(key)
+        if sheet_url in graph['sheets']:
+            graph['order'].append(sheet_url)
+            for import_url in graph['sheets'][sheet_url]['imports']:
+                walk(import_url, visited)
+
+    visited = set()
+    for css_url in css_urls:
+        if css_url and not css_url.startswith('data:'):
+            walk(css_url, visited)
+    return graph
+
+# Build manifests published by bundlers. Chunk paths in Next.js manifests are
+# relative to the /_next/ directory; `new Set([...])` holds the SSG routes.
+NEXT_MANIFEST_URL_PATTERN = re.compile(r'^(.*)/_next/static/([^/]+)/_(?:buildManifest|ssgManifest)\.js')
+NEXT_CHUNK_PATH_PATTERN = re.compile(r'["\']((?:\.\./)?static/[^"\']+?\.(?:js|css))["\']')
+NEXT_SSG_ROUTES_PATTERN = re.compile(r'new Set\((\[.*?\])\)', re.DOTALL)
+# The minified build manifest is `function(s,a,...){return{"/":[s,"static/..."],...}}("...",...)`;
+# route arrays mix string literals with parameters bound to the trailing call's arguments
+NEXT_MANIFEST_PARAMS_PATTERN = re.compile(r'function\s*\(([^)]*)\)')
+NEXT_MANIFEST_ARG_PATTERN = re.compile(r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'|[^,\s][^,]*')
+NEXT_MANIFEST_ITEM_PATTERN = re.compile(r'"((?:[^"\\]|\\.)*)"|\'((?:[^\'\\]|\\.)*)\'|([A-Za-z_$][\w$]*)')
+# Hashed entry chunks as emitted by Vite (index-B2xYz9Q1.js, index.4f3e2a1b.js)
+VITE_CHUNK_PATTERN = re.compile(r'^(.*)/assets/[^/]+[.-][\w-]{8,}\.js$')
+
+def find_build_manifests(js_urls, base_url, next_build_id=None, next_asset_prefix=None):
+    """
+    Work out which bundler manifests a page is likely to have, from its scripts.
+
+    Next.js manifests are located from the buildId (or from manifest scripts
+    already on the page) and the asset prefix; Vite manifests are only probed
+    next to hashed /assets/ chunks and webpack's asset-manifest.json only next
+    to /static/js/ bundles, so pages built with neither cost no requests.
+
+    Args:
+        js_urls: Script URLs found on the page
+        base_url: URL of the page
+        next_build_id: buildId from __NEXT_DATA__, if any
+        next_asset_prefix: assetPrefix from __NEXT_DATA__, if any
+
+    Returns:
+        list: (kind, manifest URL, build id) tuples; kind is 'next-build',
+            'next-ssg', 'vite' or 'webpack'
+    """
+    parsed_base = urlparse(base_url)
+    origin = f"{parsed_base.scheme}://{parsed_base.netloc}"
+    next_roots = {}
+    vite_roots = []
+    webpack_roots = []
+    for js_url in js_urls:
+        match = NEXT_MANIFEST_URL_PATTERN.match(js_url)
+        if match:
+            next_roots.setdefault(match.group(1), match.group(2))
+        elif '/_next/static/' in js_url:
+            next_roots.setdefault(js_url[:js_url.index('/_next/static/')], None)
+        match = VITE_CHUNK_PATTERN.match(js_url.split('?', 1)[0])
+        if match and match.group(1) not in vite_roots:
+            vite_roots.append(match.group(1))
+        if '/static/js/' in js_url:
+            root = js_url[:js_url.index('/static/js/')]
+            if root not in webpack_roots:
+                webpack_roots.append(root)
+
+    if next_build_id:
+        prefix = (next_asset_prefix or '').rstrip('/')
+        if prefix and not prefix.startswith(('http://', 'https://')):
+            prefix = urljoin(origin, prefix)
+        root = prefix or next(iter(next_roots), origin)
+        next_roots[root] = next_roots.get(root) or next_build_id
+
+    manifests = []
+    for root, build_id in next_roots.items():
+        build_id = build_id or next_build_id
+        if build_id:
+            manifests.append(('next-build', f"{root}/_next/static/{build_id}/_buildManifest.js", build_id))
+            manifests.append(('next-ssg', f"{root}/_next/static/{build_id}/_ssgManifest.js", build_id))
+    for root in vite_roots:
+        manifests.append(('vite', f"{root}/.vite/manifest.json", None))
+        manifests.append(('vite', f"{root}/manifest.json", None))  # Vite before 5
+    for root in webpack_roots:
+        manifests.append(('webpack', f"{root}/asset-manifest.json", None))
+    return manifests
+
+def next_page_route(manifest_url, page_url):
+    """
+    Work out where a Next.js page's data lives and which route it was served for.
+
+    The basePath is the part of the manifest URL before /_next/ when the
+    manifest is served from the page's own origin (an assetPrefix on a CDN
+    carries no basePath).
+
+    Args:
+        manifest_url: URL of a Next.js build or SSG manifest
+        page_url: URL of the page
+
+    Returns:
+        tuple: (data root, page path without the basePath)
+    """
+    parsed_page = urlparse(page_url)
+    origin = f"{parsed_page.scheme}://{parsed_page.netloc}"
+    parsed_root = urlparse(manifest_url[:manifest_url.index('/_next/')])
+    base_path = parsed_root.path.rstrip('/') if parsed_root.netloc == parsed_page.netloc else ''
+    page_path = parsed_page.path
+    if base_path and (page_path == base_path or page_path.startswith(base_path + '/')):
+        page_path = page_path[len(base_path):]
+    return f"{origin}{base_path}", page_path.rstrip('/') or '/'
+
+def next_route_chunks(text, routes):
+    """
+    List the chunk paths a Next.js build manifest gives for some routes.
+
+    Args:
+        text: Body of _buildManifest.js
+        routes: Route keys to look up, e.g. ['/_app', '/blog/[slug]']
+
+    Returns:
+        list: Chunk paths relative to /_next/, in manifest order
+    """
+    params = {}
+    match = NEXT_MANIFEST_PARAMS_PATTERN.search(text)
+    call = text.rfind('}(')
+    if match and call > match.end():
+        names = [name.strip() for name in match.group(1).split(',')]
+        args_end = text.find(')', call + 2)
+        args = NEXT_MANIFEST_ARG_PATTERN.findall(text[call + 2:args_end if args_end >= 0 else len(text)])
+        for name, arg in zip(names, args):
+            arg = arg.strip()
+            if arg[:1] in ('"', "'"):
+                params[name] = arg[1:-1]
+
+    paths = []
+    for route in routes:
+        match = re.search(r'["\']' + re.escape(route) + r'["\']\s*:\s*\[((?:"[^"]*"|\'[^\']*\'|[^\]"\'])*)\]', text)
+        if not match:
+            continue
+        for double, single, name in NEXT_MANIFEST_ITEM_PATTERN.findall(match.group(1)):
+            path = double or single or params.get(name)
+            if path and path.startswith(('static/', '../static/')) and path.endswith(('.js', '.css')):
+                paths.append(path)
+    return paths
+
+def parse_build_manifest(kind, text, manifest_url, page_url, build_id=None, next_page=None):
+    """
+    List the files a bundler manifest says exist.
+
+    Next.js manifests list every page of the site; only the current page's
+    chunks (plus _app's) and its pre-rendered data are taken from them.
+
+    Args:
+        kind: Manifest kind from find_build_manifests
+        text: Manifest body
+        manifest_url: URL the manifest was loaded from
+        page_url: URL of the page (Next.js data routes live on its origin)
+        build_id: Next.js buildId
+        next_page: Route of the page from __NEXT_DATA__ (e.g. '/blog/[slug]')
+
+    Returns:
+        list: Absolute URLs, or None if the body is not a manifest of that kind
+
+    Raises:
+        ValueError: If the SSG route list is not valid JSON
+    """
+    if kind == 'next-build':
+        if '__BUILD_MANIFEST' not in text:
+            return None
+        next_root = manifest_url[:manifest_url.index('/_next/') + len('/_next/')]
+        route = next_page or next_page_route(manifest_url, page_url)[1]
+        paths = next_route_chunks(text.replace('\\/', '/'), ['/_app', route])
+        return [urljoin(next_root, path) for path in dict.fromkeys(paths)][:JS_CHUNK_LIMIT]
+
+    if kind == 'next-ssg':
+        if '__SSG_MANIFEST' not in text:
+            return None
+        match = NEXT_SSG_ROUTES_PATTERN.search(text)
+        routes = json.loads(match.group(1)) if match else []
+        data_root, page_path = next_page_route(manifest_url, page_url)
+        if (next_page or page_path) not in routes:
+            return []  # Rendered per request, there is no data file to save
+        return [f"{data_root}/_next/data/{build_id}{'/index' if page_path == '/' else page_path}.json"]
+
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+
+    if kind == 'vite':
+        root = manifest_url.rsplit('/.vite/', 1)[0] if '/.vite/' in manifest_url else manifest_url.rsplit('/', 1)[0]
+        chunks = [chunk for chunk in data.values() if isinstance(chunk, dict) and 'file' in chunk]
+        if not chunks:
+            return None  # Probably a web app manifest
+        paths = []
+        for chunk in chunks:
+            paths.append(chunk['file'])
+            paths.extend(chunk.get('css', []))
+            paths.extend(chunk.get('assets', []))
+        return [urljoin(root + '/', path) for path in paths]
+
+    if kind == 'webpack':
+        files = data.get('files')
+        if not isinstance(files, dict):
+            return None
+        root = manifest_url.rsplit('/', 1)[0]
+        return [urljoin(root + '/', path) for path in files.values()
+                if isinstance(path, str) and not path.endswith(('.map', '.html', '.txt'))]
+    return None
+
+def discover_manifest_assets(js_urls, base_url, content_store, next_build_id=None, next_asset_prefix=None,
+                             next_page=None):
+    """
+    Fetch the bundler manifests a page has and enumerate the chunks they list.
+
+    Candidate manifests come from find_build_manifests and are fetched in
+    parallel through the job's content store. Missing manifests cost a single
+    request each, a malformed one is skipped, and at most JS_CHUNK_LIMIT
+    files are listed.
+
+    Args:
+        js_urls: Script URLs found on the page
+        base_url: URL of the page
+        content_store: ContentStore of the job
+        next_build_id: buildId from __NEXT_DATA__, if any
+        next_asset_prefix: assetPrefix from __NEXT_DATA__, if any
+        next_page: Route of the page from __NEXT_DATA__, if any
+
+    Returns:
+        dict: 'manifests' maps each manifest found to its kind, 'urls' lists
+            the files they reference in manifest order, 'probed' counts the
+            manifest requests made
+    """
+    found = {'manifests': {}, 'urls': [], 'probed': 0}
+    candidates = find_build_manifests(js_urls, base_url, next_build_id, next_asset_prefix)
+    if not candidates:
+        return found
+
+    downloader = AssetDownloader(content_store.get)
+    for kind, manifest_url, build_id in candidates:
+        downloader.submit(manifest_url, (kind, build_id))
+    listed = {}
+    for manifest_url, (kind, build_id), entry, error in downloader.results():
+        found['probed'] += 1
+        if error is not None or entry['error'] or entry['status'] != 200:
+            continue
+        try:
+            urls = parse_build_manifest(kind, decode_body(entry), manifest_url, base_url, build_id, next_page)
+        except ValueError as e:
+            print(f"Error parsing build manifest {manifest_url}: {str(e)}")
+            continue
+        if urls is not None:
+            found['manifests'][manifest_url] = kind
+            listed[manifest_url] = urls
+
+    # Results arrive in completion order; report them in probe order
+    for kind, manifest_url, build_id in candidates:
+        found['urls'].extend(listed.get(manifest_url, []))
+    found['urls'] = list(dict.fromkeys(found['urls']))[:JS_CHUNK_LIMIT]
+    return found
+
+def extract_assets(html_content, base_url, session_obj=None, headers=None, content_store=None):
+    """Extract all assets from HTML content (markup or a ParsedDocument)"""
     assets = {
         'css': [],
         'js': [],
@@ -664,21 +2284,17 @@ def extract_assets(html_content, base_url, session_obj=None, headers=None):
         'components': {}
     }
     
+    document = html_content if isinstance(html_content, ParsedDocument) else ParsedDocument(html_content)
+    html_content = document.html_content
     if not html_content:
         print("Warning: Empty HTML content provided to extract_assets")
         return assets
     
     try:
-        # Create BeautifulSoup object
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        if not soup or not soup.html:
-            print("Warning: Could not parse HTML content properly")
-            # Try with a more lenient parser
-            soup = BeautifulSoup(html_content, 'html5lib')
-            if not soup or not soup.html:
-                print("Error: Failed to parse HTML with both parsers")
-                return assets
+        # Reuse the shared tree; it is only parsed on first use
+        soup = document.soup
+        if soup is None:
+            return assets
         
         # Extract metadata
         try:
@@ -687,223 +2303,136 @@ def extract_assets(html_content, base_url, session_obj=None, headers=None):
             print(f"Error extracting metadata: {str(e)}")
             traceback.print_exc()
         
-        # Extract all CSS files
-        try:
-            css_links = soup.find_all('link', {'rel': 'stylesheet'}) or []
-            # Also look for preload links with as="style"
-            preload_css = soup.find_all('link', {'rel': 'preload', 'as': 'style'}) or []
-            
-            for link in css_links + preload_css:
-                href = link.get('href')
-                if href:
-                    if not href.startswith(('http://', 'https://', 'data:')):
-                        href = urljoin(base_url, href)
-                    if href.startswith(('http://', 'https://')):
-                        assets['css'].append(href)
-        except Exception as e:
-            print(f"Error extracting CSS links: {str(e)}")
-        
-        # Look for Next.js specific CSS files
-        try:
-            next_css = soup.find_all('link', {'data-n-g': True}) or []
-            next_css += soup.find_all('link', {'data-n-p': True}) or []
-            for link in next_css:
-                href = link.get('href')
-                if href:
-                    if not href.startswith(('http://', 'https://', 'data:')):
-                        href = urljoin(base_url, href)
-                    if href.startswith(('http://', 'https://')):
-                        assets['css'].append(href)
-        except Exception as e:
-            print(f"Error extracting Next.js CSS: {str(e)}")
-                    
-        # Extract all inline styles and check for CSS imports or fonts
-        try:
-            style_tags = soup.find_all('style') or []
-            for style in style_tags:
-                style_content = style.string
-                if style_content:
-                    # Extract @import statements
-                    import_urls = re.findall(r'@import\s+[\'"]([^\'"]+)[\'"]', style_content) or []
-                    import_urls += re.findall(r'@import\s+url\([\'"]?([^\'"|\)]+)[\'"]?\)', style_content) or []
-                    
-                    for import_url in import_urls:
-                        if not import_url.startswith(('http://', 'https://', 'data:')):
-                            import_url = urljoin(base_url, import_url)
-                        if import_url.startswith(('http://', 'https://')):
-                            assets['css'].append(import_url)
-                    
-                    # Extract font families
-                    font_families = re.findall(r'font-family:\s*[\'"]?([^\'";]+)[\'"]?', style_content) or []
-                    for family in font_families:
-                        family = family.strip().split(',')[0].strip('\'"`')
-                        if family and family.lower() not in ['serif', 'sans-serif', 'monospace', 'cursive', 'fantasy', 'system-ui']:
-                            assets['font_families'].add(family)
-        except Exception as e:
-            print(f"Error extracting inline styles: {str(e)}")
-    
-        # Extract all JavaScript files
-        try:
-            script_tags = soup.find_all('script', {'src': True}) or []
-            for script in script_tags:
-                src = script.get('src')
-                if src:
-                    if not src.startswith(('http://', 'https://', 'data:')):
-                        src = urljoin(base_url, src)
-                    if src.startswith(('http://', 'https://')):
-                        assets['js'].append(src)
-            
-            # Look for module scripts (common in modern frameworks)
-            module_scripts = soup.find_all('script', {'type': 'module'}) or []
-            for script in module_scripts:
-                src = script.get('src')
-                if src:
-                    if not src.startswith(('http://', 'https://', 'data:')):
-                        src = urljoin(base_url, src)
-                    if src.startswith(('http://', 'https://')):
-                        assets['js'].append(src)
-        except Exception as e:
-            print(f"Error extracting JavaScript: {str(e)}")
-        
-        # Extract all images
-        try:
-            # Regular img tags
-            img_tags = soup.find_all('img') or []
-            for img in img_tags:
-                # Check src attribute
-                src = img.get('src')
-                if src:
-                    if not src.startswith(('http://', 'https://', 'data:')):
-                        src = urljoin(base_url, src)
-                    if src.startswith(('http://', 'https://')):
-                        assets['img'].append(src)
-                
-                # Check srcset attribute
-                srcset = img.get('srcset')
-                if srcset:
-                    for src_str in srcset.split(','):
-                        src_parts = src_str.strip().split(' ')
-                        if src_parts:
-                            src = src_parts[0]
-                            if not src.startswith(('http://', 'https://', 'data:')):
-                                src = urljoin(base_url, src)
-                            if src.startswith(('http://', 'https://')):
-                                assets['img'].append(src)
-                
-                # Check data-src (lazy loading)
-                data_src = img.get('data-src')
-                if data_src:
-                    if not data_src.startswith(('http://', 'https://', 'data:')):
-                        data_src = urljoin(base_url, data_src)
-                    if data_src.startswith(('http://', 'https://')):
-                        assets['img'].append(data_src)
-            
-            # Background images in style attributes
-            elements_with_style = soup.select('[style]') or []
-            for element in elements_with_style:
-                style = element.get('style', '')
-                if 'background' in style or 'background-image' in style:
-                    # Try to extract URLs
-                    bg_urls = re.findall(r'url\([\'"]?([^\'"|\)]+)[\'"]?\)', style)
-                    for bg_url in bg_urls:
-                        if not bg_url.startswith(('http://', 'https://', 'data:')):
-                            bg_url = urljoin(base_url, bg_url)
-                        if bg_url.startswith(('http://', 'https://')):
-                            assets['img'].append(bg_url)
-        except Exception as e:
-            print(f"Error extracting images: {str(e)}")
-        
-        # Extract favicon
-        try:
-            favicon_links = soup.find_all('link', {'rel': lambda r: r and (r.lower() == 'icon' or 'icon' in r.lower().split())}) or []
-            for link in favicon_links:
-                href = link.get('href')
-                if href:
-                    if not href.startswith(('http://', 'https://', 'data:')):
-                        href = urljoin(base_url, href)
-                    if href.startswith(('http://', 'https://')):
-                        assets['favicons'].append(href)
-        except Exception as e:
-            print(f"Error extracting favicons: {str(e)}")
-        
-        # Extract all video sources
-        try:
-            video_tags = soup.find_all('video') or []
-            for video in video_tags:
-                # Check src attribute
-                src = video.get('src')
-                if src:
-                    if not src.startswith(('http://', 'https://', 'data:')):
-                        src = urljoin(base_url, src)
-                    if src.startswith(('http://', 'https://')):
-                        assets['videos'].append(src)
-                
-                # Check source tags inside video
-                source_tags = video.find_all('source') or []
-                for source in source_tags:
-                    src = source.get('src')
-                    if src:
-                        if not src.startswith(('http://', 'https://', 'data:')):
-                            src = urljoin(base_url, src)
-                        if src.startswith(('http://', 'https://')):
-                            assets['videos'].append(src)
-        except Exception as e:
-            print(f"Error extracting videos: {str(e)}")
-        
-        # Extract all audio sources
-        try:
-            audio_tags = soup.find_all('audio') or []
-            for audio in audio_tags:
-                # Check src attribute
-                src = audio.get('src')
+        # Walk the tree once instead of running a separate find_all() per
+        # asset type. Each match goes into its own ordered bucket and the
+        # buckets are concatenated in the order the per-type scans used to
+        # run, so the deduplicated lists come out exactly as before.
+        found = {key: [] for key in (
+            'stylesheet', 'preload_style', 'next_g', 'next_p', 'style_import',
+            'script', 'img', 'background', 'favicon', 'video', 'audio',
+            'iframe_video', 'iframe_js')}
+        next_data = None
+
+        def resolve(src):
+            if not src.startswith(('http://', 'https://', 'data:')):
+                src = urljoin(base_url, src)
+            if src.startswith(('http://', 'https://')):
+                return src
+            return None
+
+        def add(bucket, src):
+            if src:
+                src = resolve(src)
                 if src:
-                    if not src.startswith(('http://', 'https://', 'data:')):
-                        src = urljoin(base_url, src)
-                    if src.startswith(('http://', 'https://')):
-                        assets['audio'].append(src)
-                
-                # Check source tags inside audio
-                source_tags = audio.find_all('source') or []
-                for source in source_tags:
-                    src = source.get('src')
-                    if src:
-                        if not src.startswith(('http://', 'https://', 'data:')):
-                            src = urljoin(base_url, src)
-                        if src.startswith(('http://', 'https://')):
-                            assets['audio'].append(src)
-        except Exception as e:
-            print(f"Error extracting audio: {str(e)}")
-        
-        # Extract all iframes
+                    found[bucket].append(src)
+
         try:
-            iframe_tags = soup.find_all('iframe') or []
-            for iframe in iframe_tags:
-                src = iframe.get('src')
-                if src and not src.startswith('data:'):
-                    if not src.startswith(('http://', 'https://')):
-                        src = urljoin(base_url, src)
-                    if src.startswith(('http://', 'https://')):
-                        if 'youtube' in src or 'vimeo' in src:
-                            assets['videos'].append(src)
-                        else:
-                            assets['js'].append(src)  # Treat as JS resource
+            for tag in soup.find_all(True):
+                name = tag.name
+                attrs = tag.attrs
+                try:
+                    # Background images in style attributes
+                    style = attrs.get('style')
+                    if style and 'background' in style:
+                        for bg_url in re.findall(r'url\([\'"]?([^\'"|\)]+)[\'"]?\)', style):
+                            bg_url = resolve(bg_url)
+                            if bg_url:
+                                found['background'].append(bg_url)
+
+                    if name == 'link':
+                        rel = attrs.get('rel') or []
+                        rel_tokens = [rel] if isinstance(rel, str) else rel
+                        href = attrs.get('href')
+                        if 'stylesheet' in rel_tokens:
+                            add('stylesheet', href)
+                        # Also look for preload links with as="style"
+                        if 'preload' in rel_tokens and attrs.get('as') == 'style':
+                            add('preload_style', href)
+                        # Next.js specific CSS files
+                        if attrs.get('data-n-g') is not None:
+                            add('next_g', href)
+                        if attrs.get('data-n-p') is not None:
+                            add('next_p', href)
+                        if 'icon' in ' '.join(rel_tokens).lower().split():
+                            add('favicon', href)
+
+                    elif name == 'style':
+                        style_content = tag.string
+                        if style_content:
+                            # Extract @import statements
+                            import_urls = re.findall(r'@import\s+[\'"]([^\'"]+)[\'"]', style_content) or []
+                            import_urls += re.findall(r'@import\s+url\([\'"]?([^\'"|\)]+)[\'"]?\)', style_content) or []
+                            for import_url in import_urls:
+                                import_url = resolve(import_url)
+                                if import_url:
+                                    found['style_import'].append(import_url)
+
+                            # Extract font families
+                            font_families = re.findall(r'font-family:\s*[\'"]?([^\'";]+)[\'"]?', style_content) or []
+                            for family in font_families:
+                                family = family.strip().split(',')[0].strip('\'"`')
+                                if family and family.lower() not in ['serif', 'sans-serif', 'monospace', 'cursive', 'fantasy', 'system-ui']:
+                                    assets['font_families'].add(family)
+
+                    elif name == 'script':
+                        # Module scripts with a src are covered here as well
+                        add('script', attrs.get('src'))
+                        if next_data is None and attrs.get('id') == '__NEXT_DATA__':
+                            next_data = tag
+
+                    elif name == 'img':
+                        add('img', attrs.get('src'))
+
+                        # Check srcset attribute
+                        srcset = attrs.get('srcset')
+                        if srcset:
+                            for src_str in srcset.split(','):
+                                src = resolve(src_str.strip().split(' ')[0])
+                                if src:
+                                    found['img'].append(src)
+
+                        # Check data-src (lazy loading)
+                        add('img', attrs.get('data-src'))
+
+                    elif name in ('video', 'audio'):
+                        # The element's own src, then any <source> inside it
+                        add(name, attrs.get('src'))
+                        for source in tag.find_all('source'):
+                            add(name, source.get('src'))
+
+                    elif name == 'iframe':
+                        src = attrs.get('src')
+                        if src and not src.startswith('data:'):
+                            src = resolve(src)
+                            if src:
+                                if 'youtube' in src or 'vimeo' in src:
+                                    found['iframe_video'].append(src)
+                                else:
+                                    found['iframe_js'].append(src)  # Treat as JS resource
+                except Exception as e:
+                    print(f"Error extracting assets from <{name}>: {str(e)}")
         except Exception as e:
-            print(f"Error extracting iframes: {str(e)}")
-        
+            print(f"Error scanning document for assets: {str(e)}")
+
+        assets['css'] += (found['stylesheet'] + found['preload_style'] + found['next_g'] +
+                          found['next_p'] + found['style_import'])
+        assets['js'] += found['script'] + found['iframe_js']
+        assets['img'] += found['img'] + found['background']
+        assets['favicons'] += found['favicon']
+        assets['videos'] += found['video'] + found['iframe_video']
+        assets['audio'] += found['audio']
+
         # Extract Next.js specific resources
+        next_build_id = next_asset_prefix = next_page = None
         try:
             # Look for Next.js data scripts
-            next_data = soup.find('script', {'id': '__NEXT_DATA__'})
             if next_data and next_data.string:
                 try:
                     next_json = json.loads(next_data.string)
-                    # Extract buildId
-                    if 'buildId' in next_json:
-                        build_id = next_json['buildId']
-                        # Add common Next.js resources with this buildId
-                        for path in ['main', 'webpack', 'framework', 'pages/_app', 'pages/_error', 'pages/index']:
-                            chunk_url = f"{base_url}/_next/static/{build_id}/pages/{path}.js"
-                            assets['js'].append(chunk_url)
+                    # buildId and assetPrefix locate the build manifests, which list the real chunks
+                    next_build_id = next_json.get('buildId')
+                    next_asset_prefix = next_json.get('assetPrefix')
+                    next_page = next_json.get('page')
                         
                     # Extract page data
                     if 'page' in next_json and 'props' in next_json.get('props', {}):
@@ -922,86 +2451,566 @@ def extract_assets(html_content, base_url, session_obj=None, headers=None):
             print(f"Error extracting Next.js resources: {str(e)}")
         
         # Try to download CSS files and extract additional assets
-        if session_obj and headers:
+        if content_store is None and session_obj and headers:
+            content_store = ContentStore(session_obj, headers)
+        if content_store is not None:
             try:
-                css_urls = assets['css'].copy()  # Copy to avoid modifying during iteration
-                for css_url in css_urls:
-                    try:
-                        # Skip data URLs
-                        if css_url.startswith('data:'):
-                            continue
-                            
-                        # Download CSS file
-                        response = session_obj.get(
-                            css_url, 
-                            timeout=10, 
-                            headers=headers,
-                            verify=False  # Ignore SSL certificate errors
-                        )
-                        
-                        if response.status_code == 200:
-                            css_content = response.text
-                            
-                            # Extract URLs from url() function
-                            url_matches = re.findall(r'url\([\'"]?([^\'"|\)]+)[\'"]?\)', css_content) or []
-                            for url in url_matches:
-                                if not url or url.startswith('data:'):
-                                    continue
-                                    
-                                if not url.startswith(('http://', 'https://')):
-                                    # Resolve relative to the CSS file
-                                    url = urljoin(css_url, url)
-                                    
-                                # Determine asset type
-                                asset_type = get_asset_type(url)
-                                if asset_type in assets:
-                                    assets[asset_type].append(url)
-                            
-                            # Extract font families
-                            font_families = re.findall(r'font-family:\s*[\'"]?([^\'";]+)[\'"]?', css_content) or []
-                            for family in font_families:
-                                family = family.strip().split(',')[0].strip('\'"`')
-                                if family and family.lower() not in ['serif', 'sans-serif', 'monospace', 'cursive', 'fantasy', 'system-ui']:
-                                    assets['font_families'].add(family)
-                            
-                            # Extract Google Fonts specifically
-                            google_fonts_imports = re.findall(r'@import\s+url\([\'"]?(https?://fonts\.googleapis\.com/[^\'"|\)]+)[\'"]?\)', css_content) or []
-                            for font_url in google_fonts_imports:
-                                if font_url not in assets['css']:
-                                    assets['css'].append(font_url)
-                                    
-                            # Check for Tailwind
-                            if 'tailwind' in css_content.lower() or '.tw-' in css_content:
-                                print("Detected Tailwind CSS in stylesheets")
-                    except Exception as css_error:
-                        print(f"Error processing CSS {css_url}: {str(css_error)}")
+                # Enumerate the chunks listed in Next.js, Vite and webpack build manifests
+                manifest_assets = discover_manifest_assets(assets['js'], base_url, content_store,
+                                                           next_build_id, next_asset_prefix, next_page)
+                for manifest_url, kind in manifest_assets['manifests'].items():
+                    if kind.startswith('next-'):
+                        assets['js'].append(manifest_url)  # Loaded by the page itself
+                for chunk_url in manifest_assets['urls']:
+                    if urlparse(chunk_url).path.endswith('.json'):
+                        # Pre-rendered page data is not a script, keep it in its own folder
+                        assets.setdefault('data', []).append(chunk_url)
+                        continue
+                    asset_type = get_asset_type(chunk_url)
+                    if asset_type in assets:
+                        assets[asset_type].append(chunk_url)
+                if manifest_assets['probed']:
+                    print(f"Build manifests: {len(manifest_assets['manifests'])} found of "
+                          f"{manifest_assets['probed']} probed, {len(manifest_assets['urls'])} files listed")
+            except Exception as e:
+                print(f"Error reading build manifests: {str(e)}")
+            
+            try:
+                # Fetch linked stylesheets and their @import chains in parallel
+                css_graph = resolve_css_graph(assets['css'], content_store)
+                fetched = {normalize_url(sheet_url) for sheet_url in css_graph['sheets']}
+                for sheet_url in css_graph['order']:
+                    sheet = css_graph['sheets'][sheet_url]
+                    if sheet['error']:
+                        print(f"Error processing CSS {sheet_url}: {sheet['error']}")
+                        continue
+                    
+                    # Imported sheets are stylesheets of the page as well, down to CSS_IMPORT_MAX_DEPTH
+                    assets['css'].extend(import_url for import_url in sheet['imports']
+                                         if normalize_url(import_url) in fetched)
+                    
+                    # Assets referenced with url(), resolved relative to the sheet
+                    for ref in sheet['references']:
+                        asset_type = get_asset_type(ref)
+                        if asset_type in assets:
+                            assets[asset_type].append(ref)
+                    
+                    assets['font_families'].update(sheet['font_families'])
+                
+                if any(sheet['tailwind'] for sheet in css_graph['sheets'].values()):
+                    print("Detected Tailwind CSS in stylesheets")
+                for cycle in css_graph['cycles']:
+                    print(f"CSS @import cycle: {' -> '.join(cycle)}")
+                if css_graph['too_deep']:
+                    print(f"Skipped {len(css_graph['too_deep'])} @import(s) nested deeper than {CSS_IMPORT_MAX_DEPTH} levels")
+                print(f"Resolved {len(css_graph['sheets'])} stylesheets, "
+                      f"{max((sheet['depth'] for sheet in css_graph['sheets'].values()), default=0)} level(s) of @import")
+                assets['css_graph'] = css_graph
             except Exception as e:
                 print(f"Error processing CSS files: {str(e)}")
         
         # Extract UI components
         try:
-            components = extract_component_structure(soup)
-            if components:
-                assets['components'] = components
-        except Exception as e:
-            print(f"Error extracting components: {str(e)}")
-            traceback.print_exc()
-        
-        # Remove duplicates while preserving order
-        for asset_type in assets:
-            if isinstance(assets[asset_type], list):
-                # Use dict.fromkeys to remove duplicates while preserving order
-                assets[asset_type] = list(dict.fromkeys(assets[asset_type]))
-                
-        return assets
+            components = extract_component_structure(soup)
+            if components:
+                assets['components'] = components
+        except Exception as e:
+            print(f"Error extracting components: {str(e)}")
+            traceback.print_exc()
+        
+        # Remove duplicates while preserving order
+        for asset_type in assets:
+            if isinstance(assets[asset_type], list):
+                # Use dict.fromkeys to remove duplicates while preserving order
+                assets[asset_type] = list(dict.fromkeys(assets[asset_type]))
+                
+        return assets
+        
+    except Exception as e:
+        print(f"Error in extract_assets: {str(e)}")
+        traceback.print_exc()
+        return assets
+
+class AssetDownloader:
+    """
+    Bounded worker pool for downloading assets concurrently.
+
+    At most `max_workers` downloads run at once, and at most `per_host` of them
+    against the same host. Finished downloads are handed back to the thread that
+    iterates `results()`, so the caller can keep archive writes serialized.
+
+    Args:
+        fetch: Callable taking a URL and returning the download result
+        max_workers: Global concurrency limit
+        per_host: Concurrency limit per host
+    """
+    def __init__(self, fetch, max_workers=ASSET_DOWNLOAD_WORKERS, per_host=ASSET_DOWNLOAD_PER_HOST):
+        self.fetch = fetch
+        self.max_workers = max(1, max_workers)
+        self.per_host = max(1, per_host)
+        self._queue = deque()
+        self._inflight = {}
+        self._host_counts = {}
+
+    def submit(self, url, context=None):
+        """Queue a URL for download; `context` is returned alongside its result"""
+        self._queue.append((url, context))
+
+    def _dispatch(self, executor):
+        """Start queued downloads while global and per-host slots are free"""
+        skipped = deque()
+        while self._queue and len(self._inflight) < self.max_workers:
+            url, context = self._queue.popleft()
+            host = urlparse(url).netloc
+            if self._host_counts.get(host, 0) >= self.per_host:
+                skipped.append((url, context))
+                continue
+            self._host_counts[host] = self._host_counts.get(host, 0) + 1
+            future = executor.submit(self.fetch, url)
+            self._inflight[future] = (url, context, host)
+        # Keep the original order for downloads that are still waiting on their host
+        skipped.extend(self._queue)
+        self._queue = skipped
+
+    def results(self):
+        """
+        Run the queued downloads and yield them as they finish.
+
+        URLs submitted while iterating are picked up as well.
+
+        Yields:
+            tuple: (url, context, result, error) where error is the raised exception or None
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='asset-download') as executor:
+            while self._queue or self._inflight:
+                self._dispatch(executor)
+                done, _ = wait(list(self._inflight), return_when=FIRST_COMPLETED)
+                for future in done:
+                    url, context, host = self._inflight.pop(future)
+                    self._host_counts[host] -= 1
+                    try:
+                        result, error = future.result(), None
+                    except Exception as e:
+                        result, error = None, e
+                    yield url, context, result, error
+
+# Patterns for chunk references in JS bundles. Webpack's chunk URL function
+# concatenates a prefix, the chunk id (optionally mapped to a name), a hash
+# map lookup and a suffix: "static/chunks/"+e+"."+{12:"ab12cd34"}[e]+".js".
+# CSS chunk functions map ids straight to file names: "static/css/"+{12:"f00"}[e]+".css".
+JS_CHUNK_MAP_PATTERN = re.compile(
+    r'(?:"(?P<prefix>[^"\n]{0,200})"\s*\+\s*)?'
+    r'(?P<id>\(\s*\{(?P<names>[^{}]{0,65536})\}\s*\[\s*\w+\s*\]\s*\|\|\s*\w+\s*\)|\b\w{1,3})'
+    r'\s*\+\s*"(?P<sep>[^"\n]{0,20})"\s*\+\s*\{(?P<hashes>[^{}]{1,65536})\}\s*\[\s*\w+\s*\]\s*\+\s*"(?P<suffix>[^"\n]{1,40})"'
+)
+JS_CSS_CHUNK_MAP_PATTERN = re.compile(
+    r'"(?P<prefix>[^"\n]{0,200})"\s*\+\s*\{(?P<names>[^{}]{1,65536})\}\s*\[\s*\w+\s*\]\s*\+\s*"(?P<suffix>\.css[^"\n]{0,20})"'
+)
+JS_MAP_ENTRY_PATTERN = re.compile(r'(\w+|"[^"]*"|\'[^\']*\')\s*:\s*"([^"]*)"')
+# import("./x.js"), and static import/export ... from "./x.js" between ES module chunks
+JS_IMPORT_PATTERN = re.compile(
+    r'\bimport\s*\(\s*["\'`]([^"\'`\s]{1,512})["\'`]\s*\)'
+    r'|\b(?:from|import)\s*["\']((?:\.{1,2}/|/)[^"\'\s]{1,512})["\']'
+)
+JS_PUBLIC_PATH_PATTERN = re.compile(r'(?:__webpack_require__|\b[a-zA-Z_$]{1,2})\.p\s*=\s*"([^"\n]{0,300})"')
+JS_SCAN_WINDOW_BYTES = 1024 * 1024
+JS_SCAN_OVERLAP_BYTES = 140 * 1024  # Longer than the longest match above
+
+_js_scan_pool = None
+_js_scan_pool_lock = threading.Lock()
+
+def parse_js_map(literal):
+    """Parse the entries of a minified object literal of strings into a dict"""
+    return {key.strip('"\''): value for key, value in JS_MAP_ENTRY_PATTERN.findall(literal)}
+
+def scan_js_bundle(source):
+    """
+    Scan a JS bundle for chunk references, reading it in overlapping windows.
+
+    Runs in the scan worker processes, so it only takes and returns plain data.
+
+    Args:
+        source: Bundle body as bytes, or the path of a spooled body
+
+    Returns:
+        dict: 'chunk_files' (paths built from webpack chunk maps, relative to
+            the public path), 'imports' (module specifiers, relative to the
+            bundle) and 'public_path' (first __webpack_require__.p value or None)
+    """
+    found = {'chunk_files': [], 'imports': [], 'public_path': None}
+    seen = set()
+
+    def add(key, value):
+        if (key, value) not in seen:
+            seen.add((key, value))
+            found[key].append(value)
+
+    def scan(text):
+        for match in JS_CHUNK_MAP_PATTERN.finditer(text):
+            names = parse_js_map(match.group('names')) if match.group('names') is not None else {}
+            prefix = match.group('prefix') or ''
+            for chunk_id, chunk_hash in parse_js_map(match.group('hashes')).items():
+                add('chunk_files', f"{prefix}{names.get(chunk_id, chunk_id)}{match.group('sep')}{chunk_hash}{match.group('suffix')}")
+        for match in JS_CSS_CHUNK_MAP_PATTERN.finditer(text):
+            for name in parse_js_map(match.group('names')).values():
+                add('chunk_files', f"{match.group('prefix')}{name}{match.group('suffix')}")
+        for match in JS_IMPORT_PATTERN.finditer(text):
+            add('imports', match.group(1) or match.group(2))
+        if found['public_path'] is None:
+            match = JS_PUBLIC_PATH_PATTERN.search(text)
+            if match:
+                found['public_path'] = match.group(1)
+
+    if isinstance(source, (bytes, bytearray)):
+        body = BytesIO(source)
+    else:
+        body = open(source, 'rb')
+    with body:
+        tail = b''
+        while True:
+            block = body.read(JS_SCAN_WINDOW_BYTES)
+            if not block:
+                break
+            window = tail + block
+            scan(window.decode('utf-8', errors='replace'))
+            tail = window[-JS_SCAN_OVERLAP_BYTES:]
+    return found
+
+def run_js_scan(entry):
+    """
+    Scan a downloaded bundle on the scan process pool, or inline without one.
+
+    The pool is started on first use with JS_SCAN_WORKERS processes. Workers
+    are spawned, not forked: the pool is created from a download thread while
+    other threads hold locks, and a forked child could inherit them locked.
+    If the pool can't be started or breaks, it is shut down and scanning
+    falls back to the calling thread.
+
+    Returns:
+        dict: Result of scan_js_bundle
+    """
+    global _js_scan_pool
+    source = entry.get('body_path') or entry['body'] or b''
+    if JS_SCAN_WORKERS > 0:
+        with _js_scan_pool_lock:
+            if _js_scan_pool is None:
+                try:
+                    _js_scan_pool = ProcessPoolExecutor(max_workers=JS_SCAN_WORKERS,
+                                                        mp_context=multiprocessing.get_context('spawn'))
+                except (OSError, NotImplementedError, ValueError) as e:
+                    print(f"JS scan pool unavailable, scanning inline: {str(e)}")
+                    _js_scan_pool = False
+            pool = _js_scan_pool
+        if pool:
+            try:
+                return pool.submit(scan_js_bundle, source).result()
+            except (BrokenProcessPool, OSError, pickle.PicklingError, RuntimeError) as e:
+                print(f"JS scan pool failed, scanning inline: {str(e)}")
+                with _js_scan_pool_lock:
+                    if _js_scan_pool is pool:
+                        _js_scan_pool = False
+                    else:
+                        pool = None  # Another thread already shut it down
+                if pool:
+                    pool.shutdown(wait=False, cancel_futures=True)
+    return scan_js_bundle(source)
+
+def find_bundle_chunks(bundle_url, entry):
+    """
+    List the chunk URLs a downloaded JS bundle can load.
+
+    Chunk-map paths are resolved against the bundle's public path; without
+    one, against the directory that holds /static/ (webpack and Next.js
+    layouts) or else the bundle's own directory. Module imports are resolved
+    against the bundle URL.
+
+    Args:
+        bundle_url: URL the bundle was downloaded from
+        entry: Content store entry of the bundle
+
+    Returns:
+        list: Absolute chunk URLs, empty for anything that is not a script
+    """
+    if entry['error'] or entry['status'] != 200 or not entry['size'] or entry['size'] > JS_SCAN_MAX_BYTES:
+        return []
+    content_type = (entry['headers'].get('Content-Type', '') if entry['headers'] else '').lower()
+    path = urlparse(bundle_url).path.lower()
+    if not ('javascript' in content_type or 'ecmascript' in content_type or path.endswith(('.js', '.mjs', '.cjs'))):
+        return []
+
+    found = run_js_scan(entry)
+    public_path = found['public_path']
+    if public_path and public_path != 'auto':
+        chunk_base = urljoin(bundle_url, public_path)
+    elif '/static/' in bundle_url:
+        chunk_base = bundle_url[:bundle_url.index('/static/') + 1]
+    else:
+        chunk_base = bundle_url
+
+    urls = [urljoin(chunk_base, chunk_file) for chunk_file in found['chunk_files']]
+    for specifier in found['imports']:
+        if specifier.startswith(('./', '../', '/', 'http://', 'https://')) and '${' not in specifier:
+            urls.append(urljoin(bundle_url, specifier))
+    return [url for url in dict.fromkeys(urls) if url.startswith(('http://', 'https://'))]
+
+# Extensions of formats that are already compressed and barely shrink under deflate
+STORED_EXTENSIONS = {
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.avif', '.heic', '.ico',
+    '.woff', '.woff2',
+    '.mp4', '.m4v', '.webm', '.mov', '.mkv', '.flv', '.avi',
+    '.mp3', '.m4a', '.aac', '.ogg', '.oga', '.opus', '.flac',
+    '.zip', '.gz', '.tgz', '.br', '.bz2', '.xz', '.7z', '.rar', '.svgz',
+}
+
+# Magic bytes of compressed formats, as (offset, signature)
+COMPRESSED_SIGNATURES = [
+    (0, b'\x89PNG\r\n\x1a\n'),
+    (0, b'\xff\xd8\xff'),         # JPEG
+    (0, b'GIF87a'),
+    (0, b'GIF89a'),
+    (0, b'wOFF'),
+    (0, b'wOF2'),
+    (0, b'\x1aE\xdf\xa3'),        # WebM / Matroska
+    (0, b'OggS'),
+    (0, b'ID3'),                  # MP3 with ID3 tag
+    (0, b'fLaC'),
+    (0, b'PK\x03\x04'),           # Zip
+    (0, b'\x1f\x8b'),             # Gzip
+    (0, b'BZh'),
+    (0, b'\xfd7zXZ\x00'),
+    (0, b"7z\xbc\xaf'\x1c"),
+    (0, b'Rar!'),
+    (4, b'ftyp'),                 # MP4 / MOV / AVIF / HEIC
+]
+
+def is_compressed_payload(head):
+    """Check the first bytes of a body for the signature of a compressed format"""
+    if head[:4] == b'RIFF' and head[8:12] in (b'WEBP', b'AVI '):
+        return True
+    if head[:2] in (b'\xff\xfb', b'\xff\xf3', b'\xff\xf2'):  # MPEG audio frame
+        return True
+    return any(head[offset:offset + len(signature)] == signature for offset, signature in COMPRESSED_SIGNATURES)
+
+def zip_compression_for(arcname, head=b''):
+    """
+    Choose how an archive entry is compressed.
+
+    Already-compressed media and fonts are stored as-is, whether recognized by
+    extension or by sniffing `head` (the first bytes of the body). Everything
+    else is deflated at ZIP_DEFLATE_LEVEL.
+
+    Returns:
+        tuple: (compress_type, compresslevel)
+    """
+    if os.path.splitext(arcname)[1].lower() in STORED_EXTENSIONS or is_compressed_payload(head):
+        return zipfile.ZIP_STORED, None
+    return zipfile.ZIP_DEFLATED, ZIP_DEFLATE_LEVEL
+
+class BlobStore:
+    """
+    Content-addressed store of archive-ready asset bodies, shared by all jobs.
+
+    Bodies are keyed by the SHA-256 of their bytes, so the same file served
+    from different URLs or with cache-busting query strings is stored and
+    compressed only once. Each blob holds the exact bytes of a zip entry (a raw
+    deflate stream, or the body itself for stored entries), which are copied
+    straight into new archives.
+
+    Args:
+        directory: Directory holding the blobs
+        max_bytes: Maximum total size of the store on disk
+    """
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stats = {'blobs_reused': 0, 'blobs_added': 0, 'bytes_written': 0, 'bytes_added': 0}
+        self._total_bytes = None
+        self._lock = threading.Lock()
+
+    def _paths(self, digest, compress_type, level):
+        variant = 'stored' if compress_type == zipfile.ZIP_STORED else f"deflate{level}"
+        key = f"{digest}-{variant}"
+        return os.path.join(self.directory, key + '.json'), os.path.join(self.directory, key + '.blob')
+
+    def dedupe_ratio(self):
+        """Share of written bytes that were already in the store"""
+        with self._lock:
+            if not self.stats['bytes_written']:
+                return 0.0
+            return 1 - self.stats['bytes_added'] / self.stats['bytes_written']
+
+    def _load(self, digest, compress_type, level):
+        meta_path, data_path = self._paths(digest, compress_type, level)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if os.path.getsize(data_path) != meta['compress_size']:
+                return None, None
+            os.utime(meta_path)
+        except (OSError, ValueError, KeyError):
+            return None, None
+        return meta, data_path
+
+    def _add(self, digest, entry, compress_type, level):
+        meta_path, data_path = self._paths(digest, compress_type, level)
+        compressor = None
+        if compress_type == zipfile.ZIP_DEFLATED:
+            compressor = zlib.compressobj(level, zlib.DEFLATED, -15)  # Raw deflate, as stored in zip files
+        crc = 0
+        size = 0
+        tmp_path = f"{data_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open_body(entry) as src, open(tmp_path, 'wb') as out:
+                for chunk in iter(lambda: src.read(STREAM_CHUNK_BYTES), b''):
+                    crc = zlib.crc32(chunk, crc)
+                    size += len(chunk)
+                    out.write(compressor.compress(chunk) if compressor else chunk)
+                if compressor:
+                    out.write(compressor.flush())
+            meta = {'crc': crc, 'size': size, 'compress_size': os.path.getsize(tmp_path)}
+            os.replace(tmp_path, data_path)
+            tmp_meta_path = f"{meta_path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_meta_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.replace(tmp_meta_path, meta_path)
+        except OSError as e:
+            print(f"Error writing blob {digest}: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None, None
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes += meta['compress_size']
+            if self._total_bytes is None or self._total_bytes > self.max_bytes:
+                self._total_bytes = evict_lru_entries(self.directory, self.max_bytes, '.blob')
+        return meta, data_path
+
+    def write_to_zip(self, zipf, arcname, entry, stats=None):
+        """
+        Write a content store entry body into an open archive through the store.
+
+        The compression is chosen by zip_compression_for().
+
+        Args:
+            zipf: zipfile.ZipFile opened for writing
+            arcname: Name of the entry in the archive
+            entry: Content store entry (see stream_response_body)
+            stats: Optional dict receiving blob_reused / blob_added / stored_entries counters for the job
+        """
+        digest = entry.get('sha256')
+        if not digest:
+            digest = hashlib.sha256(read_body(entry)).hexdigest()
+        with open_body(entry) as src:
+            head = src.read(16)
+        compress_type, level = zip_compression_for(arcname, head)
+
+        meta, data_path = self._load(digest, compress_type, level)
+        reused = meta is not None
+        if not reused:
+            meta, data_path = self._add(digest, entry, compress_type, level)
+
+        with self._lock:
+            self.stats['blobs_reused' if reused else 'blobs_added'] += 1
+            self.stats['bytes_written'] += entry['size']
+            if not reused:
+                self.stats['bytes_added'] += entry['size']
+            if stats is not None:
+                for key in ('blob_reused' if reused else 'blob_added',
+                            'stored_entries' if compress_type == zipfile.ZIP_STORED else 'deflated_entries'):
+                    stats[key] = stats.get(key, 0) + 1
+
+        if meta is not None and ZIP_PRECOMPRESSED_WRITES:
+            try:
+                with open(data_path, 'rb') as data_file:
+                    write_precompressed_entry(zipf, arcname, data_file, compress_type,
+                                              meta['compress_size'], meta['crc'], meta['size'])
+                return
+            except (AttributeError, OSError):
+                # zipfile internals missing or the blob was evicted; compress again below
+                pass
+        zinfo = zipfile.ZipInfo(arcname, date_time=time.localtime(time.time())[:6])
+        zinfo.compress_type = compress_type
+        zinfo.external_attr = 0o600 << 16
+        if level is not None:
+            zinfo._compresslevel = level
+        with open_body(entry) as src, zipf.open(zinfo, 'w') as dst:
+            shutil.copyfileobj(src, dst, STREAM_CHUNK_BYTES)
+
+# write_precompressed_entry drives private ZipFile state (_lock, _writing, _writecheck,
+# _didModify, start_dir), which is only known to work on these Python versions; others
+# compress every entry through the public API (tests/test_zip_entries.py checks both)
+ZIP_PRECOMPRESSED_WRITES = (3, 7) <= sys.version_info[:2] <= (3, 13)
+
+def write_precompressed_entry(zipf, arcname, data_file, compress_type, compress_size, crc, size):
+    """
+    Append an entry whose compressed bytes are already available.
+
+    zipfile has no public API for this, so the local header and data are written
+    the same way ZipFile.writestr does it, minus the compression step. Only
+    call it when ZIP_PRECOMPRESSED_WRITES is set.
+    """
+    zinfo = zipfile.ZipInfo(arcname, date_time=time.localtime(time.time())[:6])
+    zinfo.compress_type = compress_type
+    zinfo.external_attr = 0o600 << 16
+    zinfo.file_size = size
+    zinfo.compress_size = compress_size
+    zinfo.CRC = crc
+    with zipf._lock:
+        if zipf._writing:
+            raise ValueError("Can't write to the ZIP file while there is another write handle open on it.")
+        zipf._writecheck(zinfo)
+        zipf._didModify = True
+        zinfo.header_offset = zipf.fp.tell()
+        zipf.fp.write(zinfo.FileHeader())
+        shutil.copyfileobj(data_file, zipf.fp, STREAM_CHUNK_BYTES)
+        zipf.filelist.append(zinfo)
+        zipf.NameToInfo[zinfo.filename] = zinfo
+        zipf.start_dir = zipf.fp.tell()
+
+BLOB_STORE = BlobStore(BLOB_STORE_DIR, BLOB_STORE_MAX_BYTES)
+
+def asset_archive_name(asset_url, asset_type, timestamp):
+    """
+    Build the archive file name for an asset from its URL.
+
+    Args:
+        asset_url: Absolute URL of the asset
+        asset_type: Bucket the asset is filed under
+        timestamp: Job timestamp, used for URLs without a file name
+
+    Returns:
+        tuple: (file name, whether the extension was made up from the bucket)
+    """
+    # Extract filename from URL
+    path = urlparse(asset_url).path
+    # Handle query parameters in the URL
+    query = urlparse(asset_url).query
+    filename = os.path.basename(unquote(path))
+    
+    # Clean filename (a made-up extension follows the bucket if it changes)
+    synthetic_ext = not filename or '.' not in filename
+    if not filename:
+        filename = f"{timestamp}_{uuid.uuid4().hex[:8]}.{asset_type}"
+    elif '.' not in filename:
+        filename = f"{filename}.{asset_type}"
         
-    except Exception as e:
-        print(f"Error in extract_assets: {str(e)}")
-        traceback.print_exc()
-        return assets
+    # Add query parameters to filename to make it unique
+    if query:
+        clean_query = re.sub(r'[^a-zA-Z0-9]', '_', query)[:30]  # Limit length
+        name, ext = os.path.splitext(filename)
+        filename = f"{name}_{clean_query}{ext}"
+    return filename, synthetic_ext
 
-def create_zip_file(html_content, assets, url, session_obj, headers, screenshots=None):
+def create_zip_file(html_content, assets, url, session_obj, headers, screenshots=None, content_store=None):
     """Create a zip file containing the extracted website data"""
+    if content_store is None:
+        content_store = ContentStore(session_obj, headers)
+        try:
+            return create_zip_file(html_content, assets, url, session_obj, headers, screenshots, content_store)
+        finally:
+            content_store.close()
+    
     # Create a temp file for the zip
     temp_zip = tempfile.NamedTemporaryFile(delete=False, suffix='.zip')
     temp_zip.close()
@@ -1014,13 +3023,31 @@ def create_zip_file(html_content, assets, url, session_obj, headers, screenshots
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     
     # Create the zip file
-    with zipfile.ZipFile(temp_zip.name, 'w', zipfile.ZIP_DEFLATED) as zipf:
+    with zipfile.ZipFile(temp_zip.name, 'w', zipfile.ZIP_DEFLATED, compresslevel=ZIP_DEFLATE_LEVEL) as zipf:
         # Write the main HTML
         zipf.writestr('index.html', html_content)
         
+        # Queue every asset for the download pool; the zip is only written from this thread.
+        # Scripts are scanned for lazily loaded chunks in the worker that downloaded them.
+        def fetch_asset(asset_url):
+            entry = content_store.get(asset_url)
+            try:
+                chunk_urls = find_bundle_chunks(asset_url, entry)
+            except Exception as e:
+                # The bundle itself downloaded fine and is still archived
+                print(f"  Error scanning {asset_url} for chunks: {str(e)}")
+                chunk_urls = []
+            return entry, chunk_urls
+        
+        downloader = AssetDownloader(fetch_asset)
+        created_dirs = set()
+        queued = set()
+        # URLs the Selenium browser was told not to load stay out of the archive
+        blocked = {normalize_url(blocked_url) for blocked_url in content_store.blocked}
+        
         # Create directories for each asset type
         for asset_type in assets.keys():
-            if asset_type in ['font_families', 'metadata', 'components']:
+            if asset_type in ['font_families', 'metadata', 'components', 'css_graph']:
                 continue  # Skip non-URL assets
                 
             # Make sure the assets[asset_type] exists and is a list before iterating
@@ -1030,68 +3057,112 @@ def create_zip_file(html_content, assets, url, session_obj, headers, screenshots
                 
             # Create the directory
             zipf.writestr(f'{asset_type}/.gitkeep', '')
+            created_dirs.add(asset_type)
             
             # Download each asset
             processed_urls = set()  # Track processed URLs to avoid duplicates
             
-            for url in assets[asset_type]:
+            for asset_url in assets[asset_type]:
                 # Skip if the URL is None, empty, or a data URL
-                if not url or url.startswith('data:'):
+                if not asset_url or asset_url.startswith('data:'):
                     continue
                     
                 # Skip if we've already processed this URL
-                if url in processed_urls:
+                if asset_url in processed_urls:
                     continue
                     
-                processed_urls.add(url)
+                processed_urls.add(asset_url)
                     
                 try:
                     # Fix URL if it's relative
-                    if url.startswith('//'):
-                        url = 'https:' + url
-                    elif url.startswith('/'):
+                    if asset_url.startswith('//'):
+                        asset_url = 'https:' + asset_url
+                    elif asset_url.startswith('/'):
                         parsed_base = urlparse(parsed_url.scheme + '://' + parsed_url.netloc)
-                        url = urljoin(parsed_base.geturl(), url)
+                        asset_url = urljoin(parsed_base.geturl(), asset_url)
                         
-                    # Extract filename from URL
-                    path = urlparse(url).path
-                    # Handle query parameters in the URL
-                    query = urlparse(url).query
-                    filename = os.path.basename(unquote(path))
-                    
-                    # Clean filename
-                    if not filename:
-                        filename = f"{timestamp}_{uuid.uuid4().hex[:8]}.{asset_type}"
-                    elif '.' not in filename:
-                        filename = f"{filename}.{asset_type}"
-                        
-                    # Add query parameters to filename to make it unique
-                    if query:
-                        clean_query = re.sub(r'[^a-zA-Z0-9]', '_', query)[:30]  # Limit length
-                        name, ext = os.path.splitext(filename)
-                        filename = f"{name}_{clean_query}{ext}"
-                        
-                    # Avoid duplicate filenames with UUID
-                    file_path = f"{asset_type}/{filename}"
-                    
-                    try:
-                        # Download the file
-                        response = session_obj.get(
-                            url, 
-                            timeout=10, 
-                            headers=headers,
-                            verify=False  # Ignore SSL certificate errors
-                        )
-                        
-                        if response.status_code == 200:
-                            zipf.writestr(file_path, response.content)
-                            print(f"  Added {file_path}")
-                        else:
-                            print(f"  Failed to download {url}, status: {response.status_code}")
-                    except Exception as e:
-                        print(f"  Error downloading {url}: {str(e)}")
+                    if normalize_url(asset_url) in blocked:
+                        continue
+                    filename, synthetic_ext = asset_archive_name(asset_url, asset_type, timestamp)
+                    # The archive path is decided once the response shows what the asset really is
+                    queued.add(normalize_url(asset_url))
+                    downloader.submit(asset_url, (asset_type, filename, synthetic_ext))
                 except Exception as e:
-                    print(f"  Error processing URL {url}: {str(e)}")
+                    print(f"  Error processing URL {asset_url}: {str(e)}")
+        
+        # Write downloads to the archive as they finish
+        download_start = time.time()
+        downloaded_count = 0
+        reclassified_count = 0
+        chunk_count = 0
+        for asset_url, (asset_type, filename, synthetic_ext), outcome, error in downloader.results():
+            result, chunk_urls = outcome if outcome else (None, [])
+            # Chunks found in a bundle join the same queue as the page's own assets
+            for chunk_url in chunk_urls:
+                key = normalize_url(chunk_url)
+                if key in queued or key in blocked or chunk_count >= JS_CHUNK_LIMIT:
+                    continue
+                queued.add(key)
+                chunk_count += 1
+                chunk_type = get_asset_type(chunk_url)
+                chunk_name, chunk_synthetic = asset_archive_name(chunk_url, chunk_type, timestamp)
+                downloader.submit(chunk_url, (chunk_type, chunk_name, chunk_synthetic))
+            if error is None and result['error']:
+                error = result['error']
+            if error is not None:
+                print(f"  Error downloading {asset_url}: {str(error)}")
+                continue
+            if result['status'] == 200:
+                # Move the asset to the bucket its Content-Type or magic bytes point to
+                with open_body(result) as body:
+                    head = body.read(16)
+                content_type = result['headers'].get('Content-Type', '') if result['headers'] else ''
+                actual_type = detect_asset_type(content_type, head, asset_type)
+                if actual_type not in created_dirs:
+                    zipf.writestr(f'{actual_type}/.gitkeep', '')
+                    created_dirs.add(actual_type)
+                if actual_type != asset_type:
+                    reclassified_count += 1
+                    if synthetic_ext:
+                        filename = f"{os.path.splitext(filename)[0]}.{actual_type}"
+                file_path = f"{actual_type}/{filename}"
+                BLOB_STORE.write_to_zip(zipf, file_path, result, stats=content_store.stats)
+                downloaded_count += 1
+                print(f"  Added {file_path}")
+            else:
+                print(f"  Failed to download {asset_url}, status: {result['status']}")
+        print(f"Downloaded {downloaded_count} assets in {time.time() - download_start:.2f}s "
+              f"({downloader.max_workers} workers, {downloader.per_host} per host)")
+        if chunk_count:
+            print(f"Found {chunk_count} lazily loaded chunks in JS bundles"
+                  f"{' (limit reached)' if chunk_count >= JS_CHUNK_LIMIT else ''}")
+        if reclassified_count:
+            print(f"Reclassified {reclassified_count} assets from their Content-Type or contents")
+        print(f"Content store: {content_store.stats['fetches']} fetches for "
+              f"{content_store.stats['requests']} requests ({content_store.stats['merged']} merged, "
+              f"{content_store.stats['seeded']} taken from the browser)")
+        print(f"HTTP cache: {content_store.stats['cache_hits']} hits, {content_store.stats['cache_misses']} misses, "
+              f"{content_store.stats['cache_revalidated']} revalidated")
+        if content_store.skipped:
+            print(f"Skipped {len(content_store.skipped)} assets on failing hosts: "
+                  f"{', '.join(content_store.breaker.open_hosts)}")
+            zipf.writestr('skipped_assets.json', json.dumps({
+                'hosts': content_store.breaker.open_hosts,
+                'urls': content_store.skipped
+            }, indent=2))
+        if content_store.blocked:
+            print(f"Left out {len(content_store.blocked)} tracker/media URLs blocked during the render")
+            zipf.writestr('blocked_requests.json', json.dumps({
+                'patterns': SELENIUM_BLOCKED_URL_PATTERNS,
+                'urls': content_store.blocked
+            }, indent=2))
+        print(f"Retries: {content_store.stats['retries']} "
+              f"({content_store.retry_budget.spent:.1f}s of retry budget used)")
+        print(f"Blob store: {content_store.stats.get('blob_reused', 0)} reused, "
+              f"{content_store.stats.get('blob_added', 0)} added "
+              f"(dedupe ratio across jobs: {BLOB_STORE.dedupe_ratio():.1%}); "
+              f"{content_store.stats.get('stored_entries', 0)} stored, "
+              f"{content_store.stats.get('deflated_entries', 0)} deflated")
         
         # Handle font families
         if 'font_families' in assets and assets['font_families']:
@@ -1106,6 +3177,10 @@ def create_zip_file(html_content, assets, url, session_obj, headers, screenshots
             metadata_content = json.dumps(assets['metadata'], indent=2)
             zipf.writestr('metadata.json', metadata_content)
             
+        # Stylesheet dependency graph (@import chains, fonts and images per sheet)
+        if assets.get('css_graph'):
+            zipf.writestr('css_graph.json', json.dumps(assets['css_graph'], indent=2))
+            
         # Handle UI components if present
         if 'components' in assets and assets['components'] and isinstance(assets['components'], dict):
             # Create components directory
@@ -1164,6 +3239,7 @@ def create_zip_file(html_content, assets, url, session_obj, headers, screenshots
             zipf.writestr('components/index.html', component_html)
             
             # Save individual components
+            fingerprint_index = {}
             for component_type, components in assets['components'].items():
                 if components:
                     zipf.writestr(f'components/{component_type}/.gitkeep', '')
@@ -1171,7 +3247,17 @@ def create_zip_file(html_content, assets, url, session_obj, headers, screenshots
                     for i, component in enumerate(components):
                         html_code = component.get('html', '')
                         if html_code:
-                            zipf.writestr(f'components/{component_type}/component_{i+1}.html', html_code)
+                            file_path = f'components/{component_type}/component_{i+1}.html'
+                            zipf.writestr(file_path, html_code)
+                            if component.get('fingerprint'):
+                                fingerprint_index.setdefault(component_type, []).append({
+                                    'file': file_path,
+                                    'fingerprint': component['fingerprint']
+                                })
+            
+            # Structural fingerprints, to match components across pages of the site
+            if fingerprint_index:
+                zipf.writestr('components/fingerprints.json', json.dumps(fingerprint_index, indent=2))
         
         # Create a README file
         readme_content = f"""# Website Clone: {domain}
@@ -1188,6 +3274,8 @@ Source URL: {url}
 - `fonts/`: Font files
 - `components/`: Extracted UI components
 - `metadata.json`: Website metadata (title, description, etc.)
+- `css_graph.json`: Stylesheets with their @import chains, fonts and images
+- `blocked_requests.json`: Tracker and media URLs the renderer did not load (advanced rendering only)
 
 ## How to Use
 
@@ -1222,7 +3310,746 @@ Generated by Website Extractor
     
     return temp_zip.name
 
-def extract_with_selenium(url, timeout=30):
+# Installed in every new document of a pooled browser: counts fetch/XHR requests in
+# flight, timestamps the last network or DOM activity and provides whenQuiet(), which
+# the readiness waits below build on. Idempotent, so the waits can also inject it late.
+PAGE_ACTIVITY_TRACKER_JS = """
+(function() {
+    if (window.__extractorActivity) return;
+    var state = window.__extractorActivity = {inflight: 0, last: performance.now()};
+    function touch() { state.last = performance.now(); }
+    try {
+        new PerformanceObserver(touch).observe({type: 'resource'});
+    } catch (e) {}
+    if (window.fetch) {
+        var fetch = window.fetch;
+        window.fetch = function() {
+            state.inflight++;
+            touch();
+            var done = function() { state.inflight--; touch(); };
+            try {
+                var pending = fetch.apply(this, arguments);
+                pending.then(done, done);
+                return pending;
+            } catch (e) {
+                done();
+                throw e;
+            }
+        };
+    }
+    var send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function() {
+        state.inflight++;
+        touch();
+        this.addEventListener('loadend', function() { state.inflight--; touch(); });
+        try {
+            return send.apply(this, arguments);
+        } catch (e) {
+            state.inflight--;
+            throw e;
+        }
+    };
+    // Animations and tickers rewrite classes and text all the time; only count new
+    // nodes and changed sources as activity
+    new MutationObserver(touch).observe(document, {
+        childList: true, subtree: true, attributes: true, attributeFilter: ['src', 'srcset', 'href']
+    });
+
+    function pendingImages() {
+        var count = 0;
+        for (var i = 0; i < document.images.length; i++) {
+            var img = document.images[i];
+            if (img.complete || !img.currentSrc && !img.src) continue;
+            var rect = img.getBoundingClientRect();
+            if (rect.width && rect.bottom > 0 && rect.top < window.innerHeight) count++;
+        }
+        return count;
+    }
+    // Calls done() once the page is loaded, nothing is in flight, no visible image
+    // is loading and nothing happened for quietMs, or after limitMs at the latest
+    state.whenQuiet = function(quietMs, limitMs, delayMs, done) {
+        var start = performance.now();
+        function check() {
+            var now = performance.now();
+            var last = state.last;
+            var entries = performance.getEntriesByType('resource');
+            if (entries.length) last = Math.max(last, entries[entries.length - 1].responseEnd);
+            var inflight = Math.max(0, state.inflight);
+            var images = pendingImages();
+            var settled = document.readyState === 'complete' && !inflight && !images && now - last >= quietMs;
+            if (settled || now - start >= limitMs) {
+                done({settled: settled, waited: now - start, inflight: inflight, images: images});
+            } else {
+                setTimeout(check, 50);
+            }
+        }
+        setTimeout(check, delayMs);
+    };
+})();
+"""
+
+# Installed next to the tracker: gathers every resource URL the page loads or
+# references while it is rendered and scrolled. Resource timing entries give what was
+# loaded (API calls excluded); a MutationObserver scans elements as they are added or
+# get new sources, including every srcset candidate and lazy-loading data attributes.
+# collect() adds computed background images and framework hints, and returns it all.
+PAGE_RESOURCE_COLLECTOR_JS = """
+(function() {
+    if (window.__extractorResources) return;
+    var urls = new Set();
+    var backgrounds = new Set();
+    var initiators = {link: 1, script: 1, img: 1, image: 1, css: 1, video: 1, audio: 1, source: 1, track: 1, other: 1};
+    function add(url, target) {
+        if (!url) return;
+        try {
+            url = new URL(url, document.baseURI).href;
+        } catch (e) {
+            return;
+        }
+        if (url.lastIndexOf('http', 0) === 0) (target || urls).add(url);
+    }
+    function addSrcset(value) {
+        if (!value) return;
+        value.split(',').forEach(function(candidate) { add(candidate.trim().split(/\\s+/)[0]); });
+    }
+    function addCssUrls(value, target) {
+        if (!value || value.indexOf('url(') < 0) return;
+        var pattern = /url\\(\\s*(['"]?)(.*?)\\1\\s*\\)/g, match;
+        while ((match = pattern.exec(value))) add(match[2], target);
+    }
+    function scan(el) {
+        switch (el.tagName) {
+            case 'LINK':
+                if (/stylesheet|icon|preload|manifest/i.test(el.rel)) add(el.href);
+                break;
+            case 'SCRIPT':
+                add(el.src);
+                break;
+            case 'IMG':
+            case 'SOURCE':
+                add(el.getAttribute('src') && el.src);
+                add(el.currentSrc);
+                addSrcset(el.getAttribute('srcset'));
+                add(el.getAttribute('data-src'));
+                addSrcset(el.getAttribute('data-srcset'));
+                break;
+            case 'VIDEO':
+            case 'AUDIO':
+                add(el.currentSrc);
+                add(el.getAttribute('poster') && el.poster);
+                break;
+        }
+        var style = el.getAttribute('style');
+        if (style) addCssUrls(style);
+    }
+    function scanTree(node) {
+        if (node.nodeType !== 1) return;
+        scan(node);
+        var all = node.getElementsByTagName('*');
+        for (var i = 0; i < all.length; i++) scan(all[i]);
+    }
+    function addEntries(entries) {
+        for (var i = 0; i < entries.length; i++) {
+            if (initiators[entries[i].initiatorType]) add(entries[i].name);
+        }
+    }
+    try {
+        new PerformanceObserver(function(list) { addEntries(list.getEntries()); }).observe({type: 'resource', buffered: true});
+    } catch (e) {}
+    new MutationObserver(function(records) {
+        records.forEach(function(record) {
+            if (record.type === 'attributes') scan(record.target);
+            else record.addedNodes.forEach(scanTree);
+        });
+    }).observe(document, {
+        childList: true, subtree: true, attributes: true,
+        attributeFilter: ['src', 'srcset', 'href', 'style', 'poster', 'data-src', 'data-srcset']
+    });
+
+    window.__extractorResources = {
+        collect: function() {
+            addEntries(performance.getEntriesByType('resource'));
+            if (document.documentElement) scanTree(document.documentElement);
+            var all = document.getElementsByTagName('*');
+            for (var i = 0; i < all.length; i++) {
+                var image = window.getComputedStyle(all[i]).backgroundImage;
+                if (image && image !== 'none') addCssUrls(image, backgrounds);
+            }
+            backgrounds.forEach(function(url) { urls.add(url); });
+            return {
+                urls: Array.from(urls),
+                backgrounds: backgrounds.size,
+                frameworks: {
+                    next: !!(window.__NEXT_DATA__ || document.querySelector('script[src*="_next"]')),
+                    angular: !!document.querySelector('[ng-version]'),
+                    // Same check as before: utility classes seen together
+                    tailwind: !!(document.querySelector('.flex') && document.querySelector('.grid') && document.querySelector('.text-'))
+                }
+            };
+        }
+    };
+})();
+"""
+
+# Waits for quiet (arguments: quiet ms, limit ms); one round trip
+PAGE_READY_WAIT_JS = PAGE_ACTIVITY_TRACKER_JS + """
+window.__extractorActivity.whenQuiet(arguments[0], arguments[1], 0, arguments[arguments.length - 1]);
+"""
+
+# Scrolls down the page in up to 20 viewport-sized steps and back to the top, waiting
+# for quiet after every step (arguments: quiet ms, limit per step ms, total limit ms).
+# The whole scroll is one round trip; the collector records what each step brings in.
+PAGE_SCROLL_JS = PAGE_ACTIVITY_TRACKER_JS + PAGE_RESOURCE_COLLECTOR_JS + """
+var quietMs = arguments[0], stepLimitMs = arguments[1], limitMs = arguments[2];
+var done = arguments[arguments.length - 1];
+var activity = window.__extractorActivity;
+var start = performance.now();
+var body = document.body || document.documentElement;
+var root = document.documentElement;
+var total = Math.max(body.scrollHeight, root.scrollHeight, body.offsetHeight, root.offsetHeight, body.clientHeight, root.clientHeight);
+var steps = Math.max(1, Math.min(20, Math.floor(total / (window.innerHeight || total || 1))));
+var positions = [];
+for (var i = 0; i <= steps; i++) positions.push(Math.floor(i * total / steps));
+positions.push(0);
+var waits = 0, settled = 0;
+function step(index) {
+    var remaining = limitMs - (performance.now() - start);
+    if (index >= positions.length || remaining <= 0) {
+        window.scrollTo(0, 0);
+        done({settled: settled === waits && index >= positions.length, waited: performance.now() - start,
+              steps: waits, settled_steps: settled});
+        return;
+    }
+    var before = window.scrollY;
+    window.scrollTo(0, positions[index]);
+    // Give lazy loaders (IntersectionObserver, scroll handlers) a moment to react
+    activity.whenQuiet(quietMs, Math.min(stepLimitMs, remaining), window.scrollY !== before ? 100 : 0, function(result) {
+        waits++;
+        if (result.settled) settled++;
+        step(index + 1);
+    });
+}
+step(0);
+"""
+
+# Clicks the first three visible matches of each selector (arguments[0]); returns the count
+PAGE_EXPAND_JS = """
+var clicked = 0;
+arguments[0].forEach(function(selector) {
+    var elements;
+    try {
+        elements = document.querySelectorAll(selector);
+    } catch (e) {
+        return;
+    }
+    for (var i = 0; i < elements.length && i < 3; i++) {
+        var el = elements[i];
+        if (!el.getClientRects().length || window.getComputedStyle(el).visibility === 'hidden') continue;
+        try {
+            el.click();
+            clicked++;
+        } catch (e) {}
+    }
+});
+return clicked;
+"""
+
+# Common UI elements that might reveal more content when clicked
+EXPAND_SELECTORS = [
+    'button.load-more', '.show-more', '.expand', '.accordion-toggle',
+    '[aria-expanded="false"]', '.menu-toggle', '.navbar-toggler',
+    '.mobile-menu-button', '.hamburger', '[data-toggle="collapse"]'
+]
+
+# Returns everything the collector gathered, installing it first on pages that lack it
+PAGE_COLLECT_JS = PAGE_RESOURCE_COLLECTOR_JS + """
+return window.__extractorResources.collect();
+"""
+
+def wait_for_page_ready(driver, quiet_ms, max_seconds):
+    """
+    Wait until the page has settled: loaded, no fetch/XHR in flight, no visible image
+    still loading, and no network or DOM activity for `quiet_ms`.
+
+    The wait runs inside the page, so it costs one WebDriver round trip.
+
+    Args:
+        driver: WebDriver of the render
+        quiet_ms: Quiet period that counts as settled
+        max_seconds: Longest wait
+
+    Returns:
+        dict: 'settled', 'waited' (ms), and the 'inflight' requests and
+            'images' still pending when the wait ended
+    """
+    if max_seconds <= 0:
+        return {'settled': False, 'waited': 0, 'inflight': 0, 'images': 0}
+    driver.set_script_timeout(max_seconds + 5)
+    return driver.execute_async_script(PAGE_READY_WAIT_JS, quiet_ms, max_seconds * 1000)
+
+def scroll_page(driver, quiet_ms, step_seconds, max_seconds):
+    """
+    Scroll through the page to trigger lazy loading, waiting for quiet after each step.
+
+    Args:
+        driver: WebDriver of the render
+        quiet_ms: Quiet period that counts as settled after a step
+        step_seconds: Longest wait for one step
+        max_seconds: Longest time for the whole scroll
+
+    Returns:
+        dict: 'settled' (every step settled), 'waited' (ms), 'steps' and 'settled_steps'
+    """
+    if max_seconds <= 0:
+        driver.execute_script("window.scrollTo(0, 0);")
+        return {'settled': False, 'waited': 0, 'steps': 0, 'settled_steps': 0}
+    driver.set_script_timeout(max_seconds + 5)
+    return driver.execute_async_script(PAGE_SCROLL_JS, quiet_ms, step_seconds * 1000, max_seconds * 1000)
+
+# Resource types whose bodies are kept from a Selenium render; documents and API
+# responses (XHR, Fetch) are not archived as assets
+CAPTURED_RESOURCE_TYPES = {'Stylesheet', 'Script', 'Image', 'Font', 'Media', 'Manifest', 'Other'}
+
+# Analytics, ad, tag manager, session recording and chat widget hosts that Selenium
+# renders don't load; subdomains are blocked too
+TRACKER_HOSTS = [
+    'google-analytics.com', 'googletagmanager.com', 'googletagservices.com', 'doubleclick.net',
+    'googlesyndication.com', 'googleadservices.com', 'adservice.google.com', 'connect.facebook.net',
+    'analytics.tiktok.com', 'snap.licdn.com', 'ads-twitter.com', 'analytics.twitter.com', 'bat.bing.com',
+    'clarity.ms', 'hotjar.com', 'fullstory.com', 'mouseflow.com', 'cdn.segment.com', 'api.segment.io',
+    'mixpanel.com', 'amplitude.com', 'heap.io', 'heapanalytics.com', 'scorecardresearch.com',
+    'quantserve.com', 'adnxs.com', 'criteo.com', 'criteo.net', 'taboola.com', 'outbrain.com',
+    'amazon-adsystem.com', 'hs-analytics.net', 'hs-banner.com', 'hsadspixel.net', 'nr-data.net',
+    'intercom.io', 'intercomcdn.com', 'driftt.com', 'drift.com', 'zdassets.com', 'tawk.to',
+    'client.crisp.chat', 'livechatinc.com', 'olark.com', 'optimizely.com',
+]
+# Media file extensions blocked with SELENIUM_BLOCK_MEDIA
+BLOCKED_MEDIA_EXTENSIONS = ['mp4', 'webm', 'ogv', 'mov', 'm4v', 'avi', 'mp3', 'm4a', 'aac', 'wav', 'ogg', 'flac', 'm3u8', 'mpd', 'ts']
+
+def blocked_url_patterns(block_trackers=SELENIUM_BLOCK_TRACKERS, block_media=SELENIUM_BLOCK_MEDIA,
+                         extra_hosts=SELENIUM_BLOCKED_HOSTS):
+    """
+    Build the Network.setBlockedURLs wildcard patterns for Selenium renders.
+
+    Args:
+        block_trackers: Block TRACKER_HOSTS
+        block_media: Block media files by extension
+        extra_hosts: More hosts to block
+
+    Returns:
+        list: URL patterns ('*' matches any run of characters)
+    """
+    hosts = (TRACKER_HOSTS if block_trackers else []) + list(extra_hosts)
+    patterns = []
+    for host in hosts:
+        patterns += [f'*://{host}/*', f'*://*.{host}/*']
+    if block_media:
+        for ext in BLOCKED_MEDIA_EXTENSIONS:
+            patterns += [f'*.{ext}', f'*.{ext}?*']
+    return patterns
+
+SELENIUM_BLOCKED_URL_PATTERNS = blocked_url_patterns()
+# Network events are read from the performance log for body capture and blocked requests
+SELENIUM_NETWORK_LOG = SELENIUM_CAPTURE_BODIES or bool(SELENIUM_BLOCKED_URL_PATTERNS)
+
+def read_network_log(driver):
+    """
+    Collect the Network events of a render from the browser's performance log.
+
+    Args:
+        driver: WebDriver started with performance logging
+
+    Returns:
+        dict: 'responses' (requestId to the response of finished asset loads)
+            and 'blocked' (URLs the browser refused to request)
+    """
+    requests_sent = {}
+    responses = {}
+    finished = set()
+    blocked = []
+    for record in driver.get_log('performance'):
+        try:
+            message = json.loads(record['message'])['message']
+        except (KeyError, ValueError):
+            continue
+        method = message.get('method')
+        params = message.get('params', {})
+        if method == 'Network.requestWillBeSent':
+            requests_sent[params.get('requestId')] = params.get('request', {}).get('url')
+        elif method == 'Network.responseReceived':
+            if params.get('type') in CAPTURED_RESOURCE_TYPES:
+                responses[params['requestId']] = params['response']
+        elif method == 'Network.loadingFinished':
+            finished.add(params.get('requestId'))
+        elif method == 'Network.loadingFailed' and params.get('blockedReason') == 'inspector':
+            # 'inspector' is the reason Chrome gives for Network.setBlockedURLs
+            url = requests_sent.get(params.get('requestId'))
+            if url:
+                blocked.append(url)
+    return {
+        'responses': {request_id: response for request_id, response in responses.items() if request_id in finished},
+        'blocked': list(dict.fromkeys(blocked))
+    }
+
+def capture_response_bodies(driver, content_store, network):
+    """
+    Copy the asset bodies Chrome downloaded during a render into the content store.
+
+    Asks DevTools for the body of every finished asset response in the
+    render's Network events, so later stages get exactly what the browser
+    got without downloading it again. Bodies Chrome no longer holds, and
+    text bodies whose Content-Type names no charset, are skipped; the store
+    fetches those as usual.
+
+    Args:
+        driver: WebDriver of the render
+        content_store: ContentStore of the job
+        network: Result of read_network_log for the render
+
+    Returns:
+        list: URLs of the captured responses
+    """
+    captured = []
+    for request_id, response in network['responses'].items():
+        url = response.get('url', '')
+        if response.get('status') != 200 or not url.startswith(('http://', 'https://')):
+            continue
+        try:
+            result = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+        except Exception:
+            continue  # Evicted from the browser's buffer
+        headers = CaseInsensitiveDict(response.get('headers', {}))
+        if result.get('base64Encoded'):
+            body = base64.b64decode(result['body'])
+        else:
+            # DevTools hands text back decoded; store it in the charset the headers declare.
+            # Without one the original encoding is unknown, so the store fetches the bytes
+            param = CHARSET_PARAM_PATTERN.search(headers.get('Content-Type', '').encode('latin-1', errors='ignore'))
+            encoding = lookup_encoding(param.group(1)) if param else None
+            if not encoding:
+                continue
+            try:
+                body = result['body'].encode(encoding)
+            except (UnicodeEncodeError, LookupError):
+                continue
+        if content_store.seed(url, response['status'], headers, body):
+            captured.append(url)
+    return captured
+
+def chrome_options():
+    """Headless Chrome options shared by every pooled browser"""
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")  # Run headless
+    chrome_options.add_argument("--disable-gpu")  # Disable GPU hardware acceleration
+    chrome_options.add_argument("--no-sandbox")  # Required for running as root
+    chrome_options.add_argument("--disable-dev-shm-usage")  # Overcome limited resource problems
+    chrome_options.add_argument("--window-size=1920,1080")  # Set window size
+    chrome_options.add_argument("--disable-notifications")  # Disable notifications
+    chrome_options.add_argument("--disable-extensions")  # Disable extensions
+    chrome_options.add_argument("--disable-infobars")  # Disable infobars
+    
+    # Avoid detection as a bot
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option("useAutomationExtension", False)
+    
+    # Add modern user agent to avoid detection
+    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36")
+    
+    if SELENIUM_NETWORK_LOG:
+        # Network events in the performance log tell what was loaded and what was blocked
+        chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        chrome_options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True, "enablePage": False})
+    return chrome_options
+
+# ChromeDriver binary resolved for the process; failed lookups are retried on the next launch
+_chromedriver_path = None
+_chromedriver_path_lock = threading.Lock()
+
+def chromedriver_path():
+    """Resolve the ChromeDriver binary once per process; None leaves it to Selenium"""
+    global _chromedriver_path
+    with _chromedriver_path_lock:
+        if _chromedriver_path is None:
+            try:
+                _chromedriver_path = ChromeDriverManager().install()
+            except Exception as e:
+                print(f"Error resolving ChromeDriver: {str(e)}")
+        return _chromedriver_path
+
+def process_tree_rss(pid):
+    """
+    Resident memory of a process and all of its descendants.
+
+    Args:
+        pid: Root process id
+
+    Returns:
+        int: Bytes, or None where /proc is not available
+    """
+    if not os.path.isdir('/proc'):
+        return None
+    children = {}
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat') as f:
+                # The command name may contain spaces; fields after it are fixed
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(name))
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    total = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        try:
+            with open(f'/proc/{current}/statm') as f:
+                total += int(f.read().split()[1]) * page_size
+        except (OSError, ValueError, IndexError):
+            pass
+        stack.extend(children.get(current, []))
+    return total
+
+class ChromePool:
+    """
+    Pool of warm headless Chrome instances shared by Selenium renders.
+
+    Starting Chrome costs more than rendering most pages, so browsers are
+    started ahead of time, checked out for one render and reset afterwards.
+    A browser that fails its health check, has served `max_uses` renders or
+    whose process tree has grown past `max_rss_mb` is quit, and a replacement
+    is started in the background.
+
+    Args:
+        size: Browsers kept open
+        max_uses: Renders before a browser is replaced (0 disables the limit)
+        max_rss_mb: Memory limit of a browser's process tree (0 disables the limit)
+    """
+    def __init__(self, size=CHROME_POOL_SIZE, max_uses=CHROME_MAX_USES, max_rss_mb=CHROME_MAX_RSS_MB):
+        self.size = max(1, size)
+        self.max_uses = max_uses
+        self.max_rss_mb = max_rss_mb
+        self.stats = {'launched': 0, 'launch_seconds': 0.0, 'checkouts': 0, 'wait_seconds': 0.0,
+                      'recycled': 0, 'unhealthy': 0}
+        self._idle = deque()
+        self._uses = {}
+        self._open = 0  # Browsers running or starting
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def _launch(self):
+        """Start one browser with the resolved driver"""
+        started = time.monotonic()
+        driver_path = chromedriver_path()
+        driver = None
+        if driver_path:
+            try:
+                driver = webdriver.Chrome(service=Service(driver_path), options=chrome_options())
+            except Exception as driver_error:
+                print(f"Error initializing Chrome WebDriver: {str(driver_error)}")
+                print("Trying alternative initialization method...")
+        if driver is None:
+            # Try alternative initialization without Service object
+            driver = webdriver.Chrome(options=chrome_options())
+        elapsed = time.monotonic() - started
+        with self._cond:
+            self._uses[driver] = 0
+            self.stats['launched'] += 1
+            self.stats['launch_seconds'] += elapsed
+        # Track page activity and collect resources from the start of every document
+        try:
+            driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': PAGE_ACTIVITY_TRACKER_JS})
+            driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': PAGE_RESOURCE_COLLECTOR_JS})
+        except Exception as e:
+            print(f"Could not install page scripts: {str(e)}")
+        try:
+            if SELENIUM_CAPTURE_BODIES:
+                # Keep bodies around until the render is over, not just the default few MB
+                driver.execute_cdp_cmd('Network.enable', {
+                    'maxTotalBufferSize': SELENIUM_CAPTURE_BUFFER_BYTES,
+                    'maxResourceBufferSize': min(SELENIUM_CAPTURE_BUFFER_BYTES, ASSET_MAX_BYTES or SELENIUM_CAPTURE_BUFFER_BYTES)
+                })
+            elif SELENIUM_BLOCKED_URL_PATTERNS:
+                driver.execute_cdp_cmd('Network.enable', {})
+            if SELENIUM_BLOCKED_URL_PATTERNS:
+                # Trackers, ads and chat widgets (and optionally media) fail without a request
+                driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': SELENIUM_BLOCKED_URL_PATTERNS})
+        except Exception as e:
+            print(f"Could not set up network interception: {str(e)}")
+        print(f"Chrome started in {elapsed:.2f}s")
+        return driver
+
+    def _release_slot(self, driver=None):
+        with self._cond:
+            self._uses.pop(driver, None)
+            self._open -= 1
+            self._cond.notify()
+
+    def warm(self):
+        """Start browsers in a background thread until the pool is full"""
+        def fill():
+            while True:
+                with self._cond:
+                    if self._closed or self._open >= self.size:
+                        return
+                    self._open += 1
+                try:
+                    driver = self._launch()
+                except Exception as e:
+                    print(f"Could not warm Chrome pool: {str(e)}")
+                    self._release_slot()
+                    return
+                with self._cond:
+                    closed = self._closed
+                    if not closed:
+                        self._idle.append(driver)
+                        self._cond.notify()
+                if closed:
+                    driver.quit()
+                    self._release_slot(driver)
+                    return
+        threading.Thread(target=fill, daemon=True).start()
+
+    def _healthy(self, driver):
+        """Return True if the browser and its driver process still respond"""
+        try:
+            process = driver.service.process
+            if process is not None and process.poll() is not None:
+                return False
+            return driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def _discard(self, driver, reason):
+        """Quit a browser, free its slot and start a replacement"""
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"Error closing WebDriver: {str(e)}")
+        with self._cond:
+            self.stats[reason] += 1
+        self._release_slot(driver)
+        self.warm()
+
+    def checkout(self, timeout=CHROME_CHECKOUT_TIMEOUT):
+        """
+        Take a healthy browser, starting one if the pool has room.
+
+        Args:
+            timeout: Seconds to wait for a browser to be returned
+
+        Returns:
+            WebDriver: Browser reserved for the caller until checkin()
+        """
+        started = time.monotonic()
+        while True:
+            with self._cond:
+                while not self._idle and self._open >= self.size:
+                    remaining = started + timeout - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"No Chrome instance free after {timeout:g}s")
+                    self._cond.wait(remaining)
+                driver = self._idle.popleft() if self._idle else None
+                if driver is None:
+                    self._open += 1
+            if driver is None:
+                try:
+                    driver = self._launch()
+                except Exception:
+                    self._release_slot()
+                    raise
+                # Fill the other slots while this render runs
+                self.warm()
+            elif not self._healthy(driver):
+                print("Replacing unresponsive Chrome instance")
+                self._discard(driver, 'unhealthy')
+                continue
+            with self._cond:
+                self.stats['checkouts'] += 1
+                self.stats['wait_seconds'] += time.monotonic() - started
+            return driver
+
+    def _reset(self, driver):
+        """Close extra tabs and clear cookies, storage and cache left by the last job"""
+        try:
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+            # Storage is per origin: clear the page's own and every origin it loaded from
+            urls = driver.execute_script(
+                "return [location.href].concat(performance.getEntriesByType('resource').map(function(e) { return e.name; }))"
+            ) or []
+            origins = {f"{parsed.scheme}://{parsed.netloc}" for parsed in map(urlparse, urls)
+                       if parsed.scheme in ('http', 'https')}
+            for origin in origins:
+                driver.execute_cdp_cmd('Storage.clearDataForOrigin', {'origin': origin, 'storageTypes': 'all'})
+            driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+            driver.execute_cdp_cmd('Network.clearBrowserCache', {})
+            driver.get('about:blank')
+            return True
+        except Exception as e:
+            print(f"Could not reset Chrome instance: {str(e)}")
+            return False
+
+    def checkin(self, driver, reusable=True):
+        """
+        Return a browser after a render, or replace it if it shouldn't be reused.
+
+        Args:
+            driver: Browser from checkout()
+            reusable: False if the render left the browser in a bad state
+        """
+        with self._cond:
+            self._uses[driver] = self._uses.get(driver, 0) + 1
+            uses = self._uses[driver]
+            closed = self._closed
+        if closed or not reusable:
+            self._discard(driver, 'unhealthy')
+            return
+        if self.max_uses and uses >= self.max_uses:
+            print(f"Recycling Chrome instance after {uses} renders")
+            self._discard(driver, 'recycled')
+            return
+        if self.max_rss_mb:
+            rss = process_tree_rss(driver.service.process.pid) if driver.service.process else None
+            if rss and rss > self.max_rss_mb * 1024 * 1024:
+                print(f"Recycling Chrome instance using {rss // (1024 * 1024)} MB")
+                self._discard(driver, 'recycled')
+                return
+        if not self._reset(driver):
+            self._discard(driver, 'unhealthy')
+            return
+        with self._cond:
+            self._idle.append(driver)
+            self._cond.notify()
+
+    def close(self):
+        """Quit every idle browser; browsers still in use are quit on checkin"""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+        for driver in idle:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+            self._release_slot(driver)
+
+    def snapshot(self):
+        """Pool size, state and counters"""
+        with self._cond:
+            return dict(self.stats, size=self.size, open=self._open, idle=len(self._idle))
+
+CHROME_POOL = ChromePool()
+atexit.register(CHROME_POOL.close)
+
+def extract_with_selenium(url, timeout=30, content_store=None):
     """
     Extract rendered HTML content using Selenium with Chrome/Chromium.
     This method will execute JavaScript and capture the fully rendered page structure.
@@ -1230,6 +4057,8 @@ def extract_with_selenium(url, timeout=30):
     Args:
         url: URL to fetch
         timeout: Maximum time to wait for page to load (seconds)
+        content_store: Optional ContentStore of the job; the asset bodies the
+            browser downloaded are added to it and their URLs are returned
         
     Returns:
         tuple: (html_content, discovered_urls, None)
@@ -1238,40 +4067,14 @@ def extract_with_selenium(url, timeout=30):
         return None, None, {"error": "Selenium is not installed. Run: pip install selenium webdriver-manager"}
     
     try:
-        print("Setting up advanced Chrome options...")
-        # Set up Chrome options with anti-detection measures
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")  # Run headless
-        chrome_options.add_argument("--disable-gpu")  # Disable GPU hardware acceleration
-        chrome_options.add_argument("--no-sandbox")  # Required for running as root
-        chrome_options.add_argument("--disable-dev-shm-usage")  # Overcome limited resource problems
-        chrome_options.add_argument("--window-size=1920,1080")  # Set window size
-        chrome_options.add_argument("--disable-notifications")  # Disable notifications
-        chrome_options.add_argument("--disable-extensions")  # Disable extensions
-        chrome_options.add_argument("--disable-infobars")  # Disable infobars
-        
-        # Avoid detection as a bot
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option("useAutomationExtension", False)
-        
-        # Add modern user agent to avoid detection
-        chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36")
-        
-        # Initialize the Chrome driver
-        print(f"Initializing Chrome WebDriver...")
+        # Take a warm browser from the pool instead of starting Chrome for every job
+        print("Checking out a Chrome instance...")
         try:
-            service = Service(ChromeDriverManager().install())
-            driver = webdriver.Chrome(service=service, options=chrome_options)
+            driver = CHROME_POOL.checkout()
         except Exception as driver_error:
-            print(f"Error initializing Chrome WebDriver: {str(driver_error)}")
-            print("Trying alternative initialization method...")
-            try:
-                # Try alternative initialization without Service object
-                driver = webdriver.Chrome(options=chrome_options)
-            except Exception as alt_error:
-                print(f"Alternative initialization also failed: {str(alt_error)}")
-                return None, None, {"error": f"Failed to initialize Chrome WebDriver: {str(alt_error)}"}
+            print(f"Could not get a Chrome instance: {str(driver_error)}")
+            return None, None, {"error": f"Failed to initialize Chrome WebDriver: {str(driver_error)}"}
+        reusable = True
         
         # Set page load timeout
         driver.set_page_load_timeout(timeout)
@@ -1279,9 +4082,23 @@ def extract_with_selenium(url, timeout=30):
         # Used to store discovered URLs
         discovered_urls = []
         
+        # Readiness waits share one deadline, so a page that never goes quiet can't stall the render
+        wait_deadline = time.monotonic() + SELENIUM_WAIT_SECONDS
+        wait_log = []
+        
+        def wait_remaining():
+            return max(0.0, wait_deadline - time.monotonic())
+        
         try:
+            if SELENIUM_NETWORK_LOG:
+                try:
+                    driver.get_log('performance')  # Drop events left over from earlier jobs
+                except Exception as e:
+                    print(f"Warning: Performance log unavailable: {str(e)}")
             print(f"Navigating to {url}...")
+            render_start = time.time()
             driver.get(url)
+            load_seconds = time.time() - render_start
             
             # Wait for page to be fully loaded
             try:
@@ -1306,146 +4123,74 @@ def extract_with_selenium(url, timeout=30):
             # Wait for page to be fully rendered
             print("Waiting for dynamic content to load...")
             try:
-                # Wait a bit for any dynamic content to load
-                time.sleep(5)
-                
-                # Wait for network to be idle
-                driver.execute_script("return window.performance.getEntriesByType('resource').length")
-                time.sleep(2)  # Wait a bit more after resources are loaded
+                ready = wait_for_page_ready(driver, SELENIUM_IDLE_MS, wait_remaining())
+                wait_log.append(ready)
+                if not ready['settled']:
+                    print(f"Page still busy after {ready['waited'] / 1000:.1f}s "
+                          f"({ready['inflight']} requests, {ready['images']} images pending), continuing")
             except Exception as e:
                 print(f"Warning while waiting for dynamic content: {str(e)}")
             
-            # Implement advanced scrolling to trigger lazy loading
+            # Scroll through the page to trigger lazy loading; one round trip for all steps
             print("Performing advanced scrolling to trigger lazy loading...")
             try:
-                # Get the total height of the page
-                total_height = driver.execute_script("return Math.max(document.body.scrollHeight, document.documentElement.scrollHeight, document.body.offsetHeight, document.documentElement.offsetHeight, document.body.clientHeight, document.documentElement.clientHeight);")
-                
-                # Scroll down the page in steps
-                viewport_height = driver.execute_script("return window.innerHeight")
-                scroll_steps = max(1, min(20, total_height // viewport_height))  # Cap at 20 steps
-                
-                for i in range(scroll_steps + 1):
-                    scroll_position = (i * total_height) // scroll_steps
-                    driver.execute_script(f"window.scrollTo(0, {scroll_position});")
-                    
-                    # Small pause to allow content to load
-                    time.sleep(0.3)
-                    
-                    # Extract resources after each scroll
-                    try:
-                        urls = driver.execute_script("""
-                            var resources = [];
-                            // Get all link hrefs
-                            document.querySelectorAll('link[rel="stylesheet"], link[as="style"]').forEach(function(el) {
-                                if (el.href) resources.push(el.href);
-                            });
-                            // Get all script srcs
-                            document.querySelectorAll('script[src]').forEach(function(el) {
-                                if (el.src) resources.push(el.src);
-                            });
-                            // Get all image srcs
-                            document.querySelectorAll('img[src]').forEach(function(el) {
-                                if (el.src && !el.src.startsWith('data:')) resources.push(el.src);
-                            });
-                            return resources;
-                        """)
-                        discovered_urls.extend(urls)
-                    except Exception as res_error:
-                        print(f"Error extracting resources during scroll: {str(res_error)}")
-                
-                # Scroll back to top
-                driver.execute_script("window.scrollTo(0, 0);")
-                
-                # Wait for everything to settle after scrolling
-                time.sleep(1)
+                scrolled = scroll_page(driver, SELENIUM_STEP_IDLE_MS, SELENIUM_STEP_MAX_SECONDS, wait_remaining())
+                wait_log.append(scrolled)
+                print(f"Scrolled in {scrolled['steps']} steps ({scrolled['settled_steps']} settled)")
             except Exception as scroll_error:
                 print(f"Error during page scrolling: {str(scroll_error)}")
             
             # Try to click on common elements that might reveal more content
             try:
-                # Common UI elements that might reveal more content when clicked
-                for selector in [
-                    'button.load-more', '.show-more', '.expand', '.accordion-toggle', 
-                    '[aria-expanded="false"]', '.menu-toggle', '.navbar-toggler',
-                    '.mobile-menu-button', '.hamburger', '[data-toggle="collapse"]'
-                ]:
-                    try:
-                        elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                        for element in elements[:3]:  # Limit to first 3 matches of each type
-                            if element.is_displayed():
-                                driver.execute_script("arguments[0].click();", element)
-                                time.sleep(0.5)  # Wait for content to appear
-                    except Exception as click_error:
-                        # Skip any errors and continue with next selector
-                        continue
-                print("Attempted to expand hidden content")
+                clicked = driver.execute_script(PAGE_EXPAND_JS, EXPAND_SELECTORS)
+                if clicked:
+                    # Wait once for the content all the clicks revealed
+                    wait_log.append(wait_for_page_ready(driver, SELENIUM_STEP_IDLE_MS, wait_remaining()))
+                print(f"Attempted to expand hidden content ({clicked} elements clicked)")
             except Exception as interact_error:
                 print(f"Error expanding content: {str(interact_error)}")
             
             # Get the final HTML content after all JavaScript executed
             html_content = driver.page_source
             print(f"HTML content captured ({len(html_content)} bytes)")
+            print(f"Waited {sum(ready['waited'] for ready in wait_log) / 1000:.2f}s for the page in {len(wait_log)} waits "
+                  f"({sum(1 for ready in wait_log if not ready['settled'])} hit their limit)")
             
-            # Extract URLs for modern frameworks
+            # Everything the collector saw while the page loaded and scrolled, in one call
             try:
-                # React/Next.js specific resources
-                next_js_urls = driver.execute_script("""
-                    var resources = [];
-                    // Find Next.js specific scripts
-                    document.querySelectorAll('script[src*="_next"]').forEach(function(el) {
-                        resources.push(el.src);
-                    });
-                    // Find chunk files
-                    document.querySelectorAll('script[src*="chunk"]').forEach(function(el) {
-                        resources.push(el.src);
-                    });
-                    // Find webpack files
-                    document.querySelectorAll('script[src*="webpack"]').forEach(function(el) {
-                        resources.push(el.src);
-                    });
-                    // Find hydration scripts
-                    document.querySelectorAll('script[src*="hydration"]').forEach(function(el) {
-                        resources.push(el.src);
-                    });
-                    return resources;
-                """)
-                discovered_urls.extend(next_js_urls)
-                
-                # Angular specific resources
-                angular_urls = driver.execute_script("""
-                    var resources = [];
-                    // Find Angular specific scripts
-                    document.querySelectorAll('script[src*="runtime"]').forEach(function(el) {
-                        resources.push(el.src);
-                    });
-                    document.querySelectorAll('script[src*="polyfills"]').forEach(function(el) {
-                        resources.push(el.src);
-                    });
-                    document.querySelectorAll('script[src*="main"]').forEach(function(el) {
-                        resources.push(el.src);
-                    });
-                    return resources;
-                """)
-                discovered_urls.extend(angular_urls)
-                
-                # Get CSS variables for Tailwind detection
-                tailwind_check = driver.execute_script("""
-                    var style = window.getComputedStyle(document.body);
-                    var hasTailwind = false;
-                    // Check for common Tailwind classes
-                    if (document.querySelector('.flex') && 
-                        document.querySelector('.grid') && 
-                        document.querySelector('.text-')) {
-                        hasTailwind = true;
-                    }
-                    return hasTailwind;
-                """)
-                
-                if tailwind_check:
+                collected = driver.execute_script(PAGE_COLLECT_JS)
+                discovered_urls.extend(collected['urls'])
+                print(f"Collected {len(collected['urls'])} resource URLs from the page "
+                      f"({collected['backgrounds']} background images)")
+                frameworks = [name for name, found in collected['frameworks'].items() if found]
+                if frameworks:
+                    print(f"Frameworks detected: {', '.join(frameworks)}")
+                if collected['frameworks']['tailwind']:
                     print("Tailwind CSS detected, including appropriate CSS files")
-            except Exception as framework_error:
-                print(f"Error detecting framework resources: {str(framework_error)}")
+            except Exception as collect_error:
+                print(f"Error collecting resources: {str(collect_error)}")
+            
+            # Keep what the browser downloaded, so the assets aren't fetched a second time,
+            # and what it was not allowed to load, so the assets aren't fetched at all
+            blocked_urls = []
+            if SELENIUM_NETWORK_LOG:
+                try:
+                    network = read_network_log(driver)
+                    blocked_urls = network['blocked']
+                    if content_store is not None:
+                        content_store.block(blocked_urls)
+                        if SELENIUM_CAPTURE_BODIES:
+                            capture_start = time.time()
+                            captured_urls = capture_response_bodies(driver, content_store, network)
+                            discovered_urls.extend(captured_urls)
+                            print(f"Captured {len(captured_urls)} asset bodies from the browser "
+                                  f"in {time.time() - capture_start:.2f}s")
+                except Exception as capture_error:
+                    print(f"Error reading network events: {str(capture_error)}")
+            print(f"Render timing: page load {load_seconds:.2f}s, readiness waits "
+                  f"{sum(ready['waited'] for ready in wait_log) / 1000:.2f}s, total {time.time() - render_start:.2f}s; "
+                  f"{len(blocked_urls)} requests blocked "
+                  f"({len({urlparse(blocked).netloc for blocked in blocked_urls})} hosts)")
             
             # Remove duplicates from discovered URLs
             discovered_urls = list(set(discovered_urls))
@@ -1458,19 +4203,36 @@ def extract_with_selenium(url, timeout=30):
             return None, None, {"error": "Timeout while loading page"}
         except WebDriverException as e:
             print(f"Selenium error: {str(e)}")
+            reusable = False
             return None, None, {"error": f"Selenium error: {str(e)}"}
         finally:
-            # Close the browser
-            print("Closing WebDriver...")
-            driver.quit()
+            # Reset the browser and hand it back to the pool
+            print("Returning Chrome instance to the pool...")
+            CHROME_POOL.checkin(driver, reusable)
     
     except Exception as e:
         print(f"Error setting up Selenium: {str(e)}")
         return None, None, {"error": f"Error setting up Selenium: {str(e)}"}
 
-def fix_relative_urls(html_content, base_url):
-    """Fix relative URLs in the HTML content"""
-    soup = BeautifulSoup(html_content, 'html.parser')
+def fix_relative_urls(document, base_url):
+    """
+    Fix relative URLs in a parsed document.
+
+    The shared tree is modified in place; call document.serialize() once all
+    stages are done to get the markup.
+
+    Args:
+        document: ParsedDocument (plain markup is parsed into a new one)
+        base_url: URL the page was fetched from
+
+    Returns:
+        ParsedDocument: The updated document
+    """
+    if not isinstance(document, ParsedDocument):
+        document = ParsedDocument(document)
+    soup = document.soup
+    if soup is None:
+        return document
     
     # Fix relative URLs for links
     for link in soup.find_all('a', href=True):
@@ -1496,7 +4258,7 @@ def fix_relative_urls(html_content, base_url):
         if not href.startswith(('http://', 'https://', 'data:')):
             link['href'] = urljoin(base_url, href)
     
-    return str(soup)
+    return document
 
 @app.route('/')
 def index():
@@ -1509,6 +4271,16 @@ def clear_session():
     session.clear()
     return jsonify({'message': 'Session cleared'})
 
+@app.route('/stats')
+def stats():
+    """Return process-wide extraction metrics"""
+    return jsonify({
+        'blob_store': dict(BLOB_STORE.stats, dedupe_ratio=BLOB_STORE.dedupe_ratio()),
+        'rate_limits': RATE_LIMITER.snapshot(),
+        'connection_pools': SHARED_HTTP_ADAPTER.pool_stats(),
+        'chrome_pool': CHROME_POOL.snapshot() if SELENIUM_AVAILABLE else None
+    })
+
 @app.route('/extract', methods=['POST'])
 def extract():
     url = request.form.get('url')
@@ -1524,8 +4296,8 @@ def extract():
         
         print(f"\n{'='*80}\nStarting extraction for: {url}\n{'='*80}")
         
-        # Create a session to maintain cookies
-        session_obj = requests.Session()
+        # Create a session to maintain cookies (connections are pooled across jobs)
+        session_obj = new_job_session()
         
         # Disable SSL verification warnings
         urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -1573,10 +4345,13 @@ def extract():
         html_content = None
         additional_urls = []
         
+        # Responses fetched during this job, shared by asset extraction and zip creation
+        content_store = ContentStore(session_obj, headers)
+        
         # Use Selenium for rendering if requested and available
         if use_selenium and SELENIUM_AVAILABLE:
             print("Using Selenium for advanced rendering...")
-            html_content, additional_urls, error_info = extract_with_selenium(url)
+            html_content, additional_urls, error_info = extract_with_selenium(url, content_store=content_store)
             
             if not html_content:
                 print("Selenium extraction failed, falling back to regular request")
@@ -1598,7 +4373,8 @@ def extract():
                     print(f"Using User-Agent: {headers['User-Agent'][:30]}...")
                     
                     # First request to get cookies and possible redirects
-                    response = session_obj.get(
+                    response = rate_limited_get(
+                        session_obj,
                         url, 
                         timeout=20,  # Increased timeout 
                         headers=headers, 
@@ -1622,47 +4398,11 @@ def extract():
                         content_type = response.headers.get('Content-Type', '')
                         print(f"Content-Type: {content_type}")
                         
-                        # Get encoding from headers or meta tag
-                        encoding = None
-                        
-                        # Try to get encoding from Content-Type header
-                        if 'charset=' in content_type:
-                            encoding = content_type.split('charset=')[1].split(';')[0].strip()
-                            print(f"Encoding from headers: {encoding}")
-                        
-                        # If no encoding specified, try to detect from content
-                        if not encoding:
-                            # Look for <meta charset="..."> tag
-                            charset_match = re.search(r'<meta.*?charset=["\']*([^\s"\'/>]+)', response.text, re.IGNORECASE)
-                            if charset_match:
-                                encoding = charset_match.group(1)
-                                print(f"Encoding from meta charset tag: {encoding}")
-                            else:
-                                # Look for <meta http-equiv="Content-Type" content="text/html; charset=...">
-                                http_equiv_match = re.search(r'<meta.*?http-equiv=["\']*content-type["\']*.*?content=["\']*.*?charset=([^\s"\'/>]+)', response.text, re.IGNORECASE)
-                                if http_equiv_match:
-                                    encoding = http_equiv_match.group(1)
-                                    print(f"Encoding from meta http-equiv tag: {encoding}")
-                        
-                        # If still no encoding, use apparent encoding from requests
-                        if not encoding and response.apparent_encoding:
-                            encoding = response.apparent_encoding
-                            print(f"Detected encoding: {encoding}")
-                        
-                        # Default to utf-8 if still no encoding
-                        if not encoding:
-                            encoding = 'utf-8'
-                            print("Using default encoding: utf-8")
-                        
-                        # Decode content with detected encoding
-                        try:
-                            html_content = response.content.decode(encoding, errors='replace')
-                            print(f"Successfully decoded HTML content with {encoding} encoding ({len(html_content)} bytes)")
-                            break  # Exit the retry loop on success
-                        except (UnicodeDecodeError, LookupError) as e:
-                            print(f"Error decoding with {encoding}: {str(e)}, falling back to utf-8")
-                            html_content = response.content.decode('utf-8', errors='replace')
-                            break  # Exit the retry loop on success with fallback
+                        # BOM, header, <meta> in the first KB, then UTF-8 or detection; decoded once
+                        html_content, encoding, encoding_source = decode_html(response.content, content_type)
+                        print(f"Encoding from {encoding_source}: {encoding}")
+                        print(f"Successfully decoded HTML content with {encoding} encoding ({len(html_content)} bytes)")
+                        break  # Exit the retry loop on success
                     
                     elif response.status_code == 403:  # Forbidden - likely bot protection
                         print(f"Received 403 Forbidden response - website is likely blocking scrapers")
@@ -1670,7 +4410,7 @@ def extract():
                         # If we have Selenium available as a fallback, try that instead
                         if SELENIUM_AVAILABLE and not use_selenium:
                             print("Trying Selenium as a fallback for 403 error...")
-                            html_content, additional_urls, error_info = extract_with_selenium(url)
+                            html_content, additional_urls, error_info = extract_with_selenium(url, content_store=content_store)
                             if html_content:
                                 print("Successfully bypassed 403 with Selenium!")
                                 break
@@ -1687,21 +4427,17 @@ def extract():
                         if session_obj.cookies:
                             print(f"Using {len(session_obj.cookies)} cookies from previous responses")
                         
-                        # Add delay to avoid rate limiting
-                        delay = random.uniform(1.0, 3.0)
+                        # Back off before retrying
+                        delay = backoff_delay(retry_count)
                         print(f"Waiting {delay:.2f} seconds before retrying...")
                         time.sleep(delay)
                         
                     elif response.status_code == 429:  # Too Many Requests
                         print(f"Received 429 Too Many Requests - rate limited")
                         
-                        # Check if we have a Retry-After header
-                        retry_after = response.headers.get('Retry-After')
-                        if retry_after and retry_after.isdigit():
-                            delay = int(retry_after) + random.uniform(0.1, 1.0)
-                        else:
-                            delay = 5 + random.uniform(1.0, 5.0)  # 5-10 second delay
-                        
+                        # The rate limiter has slowed this host down and will hold the
+                        # next request until any Retry-After period has passed
+                        delay = backoff_delay(retry_count)
                         print(f"Waiting {delay:.2f} seconds before retrying...")
                         time.sleep(delay)
                         
@@ -1711,8 +4447,8 @@ def extract():
                     elif response.status_code == 503:  # Service Unavailable - often used for anti-bot
                         print(f"Received 503 Service Unavailable - possible anti-bot measure")
                         
-                        # Try with a longer delay and new headers
-                        delay = 10 + random.uniform(1.0, 5.0)  # 10-15 second delay
+                        # Back off (the rate limiter honors any Retry-After) and rotate headers
+                        delay = backoff_delay(retry_count)
                         print(f"Waiting {delay:.2f} seconds before retrying...")
                         time.sleep(delay)
                         
@@ -1736,7 +4472,7 @@ def extract():
                     print(f"Connection error fetching {url}")
                     last_error = "Connection error"
                     # Wait before retrying
-                    time.sleep(2)
+                    time.sleep(backoff_delay(retry_count))
                     
                 except requests.exceptions.TooManyRedirects:
                     print(f"Too many redirects for {url}")
@@ -1763,8 +4499,10 @@ def extract():
         # Continue with asset extraction and zip file creation
         try:
             print("\nExtracting assets...")
+            # Parse the page once; every stage below works on the same tree
+            document = ParsedDocument(html_content)
             # Extract assets from the HTML content
-            assets = extract_assets(html_content, url, session_obj, headers)
+            assets = extract_assets(document, url, session_obj, headers, content_store=content_store)
             
             if not assets:
                 return jsonify({'error': 'Failed to extract assets from the website'}), 500
@@ -1807,42 +4545,11 @@ def extract():
                 
                 # Try to extract assets from the page using JavaScript execution (simulated)
                 try:
-                    # Look for JavaScript variables that might contain asset URLs
-                    js_asset_patterns = [
-                        r'["\'](https?://[^"\']+\.(css|js|png|jpg|jpeg|gif|svg|woff2?))["\']',
-                        r'["\'](/[^"\']+\.(css|js|png|jpg|jpeg|gif|svg|woff2?))["\']',
-                        r'["\'](//[^"\']+\.(css|js|png|jpg|jpeg|gif|svg|woff2?))["\']',
-                        r'loadCSS\(["\']([^"\']+)["\']',
-                        r'loadJS\(["\']([^"\']+)["\']',
-                        r'src=["\'](/[^"\']+)["\']',
-                        r'href=["\'](/[^"\']+\.css)["\']',
-                        # React/Next.js specific patterns
-                        r'__NEXT_DATA__\s*=\s*({.*})',
-                        r'window\.__PRELOADED_STATE__\s*=\s*({.*})',
-                        r'window\.__INITIAL_STATE__\s*=\s*({.*})',
-                        r'_ASSET_PREFIX_\s*=\s*["\']([^"\']+)["\']'
-                    ]
-                    
-                    for pattern in js_asset_patterns:
-                        matches = re.findall(pattern, html_content)
-                        for match in matches:
-                            if isinstance(match, tuple):
-                                match_url = match[0]
-                            else:
-                                match_url = match
-                                
-                            if match_url.startswith('//'):
-                                match_url = 'https:' + match_url
-                            elif match_url.startswith('/'):
-                                match_url = urljoin(url, match_url)
-                                
-                            # Skip if it's clearly not a URL (likely JSON data)
-                            if '{' in match_url or '}' in match_url:
-                                continue
-                                
-                            asset_type = get_asset_type(match_url)
-                            if asset_type in assets:
-                                assets[asset_type].append(match_url)
+                    # One bounded pass over the page for URLs in inline scripts and attributes
+                    for match_url in scan_asset_urls(html_content, url):
+                        asset_type = get_asset_type(match_url)
+                        if asset_type in assets:
+                            assets[asset_type].append(match_url)
                     
                     print("Extracted additional assets from JavaScript patterns")
                 except Exception as e:
@@ -1851,7 +4558,8 @@ def extract():
             # Try to fix relative URLs in the HTML
             try:
                 print("\nFixing relative URLs...")
-                fixed_html = fix_relative_urls(html_content, url)
+                fix_relative_urls(document, url)
+                fixed_html = document.serialize()
                 print("Relative URLs fixed")
             except Exception as e:
                 print(f"Error fixing URLs: {str(e)}")
@@ -1868,7 +4576,12 @@ def extract():
                 filename = f"{safe_domain}_{timestamp}.zip"
                 
                 # Create a zip file with the extracted content
-                zip_file_path = create_zip_file(fixed_html, assets, url, session_obj, headers)
+                try:
+                    zip_file_path = create_zip_file(fixed_html, assets, url, session_obj, headers, content_store=content_store)
+                finally:
+                    content_store.close()  # Spooled bodies are no longer needed
+                print(f"Document: parsed {document.parse_count} time(s) with {document.parser} in {document.parse_seconds:.3f}s, "
+                      f"serialized in {document.serialize_seconds:.3f}s")
                 
                 # Check if the file was created successfully
                 if not os.path.exists(zip_file_path) or os.path.getsize(zip_file_path) < 100:
@@ -1941,6 +4654,9 @@ if __name__ == '__main__':
     print("Website Extractor is running!")
     print("Access it in your browser at: http://127.0.0.1:5001")
     print("="*80 + "\n")
+    # Start browsers before the first render; with the reloader only the serving child does
+    if SELENIUM_AVAILABLE and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        CHROME_POOL.warm()
     app.run(debug=True, threaded=True, port=5001) 
 
 def main():
@@ -1949,4 +4665,7 @@ def main():
     print("Website Extractor is running!")
     print("Access it in your browser at: http://127.0.0.1:5001")
     print("="*80 + "\n")
+    # Start browsers before the first render; with the reloader only the serving child does
+    if SELENIUM_AVAILABLE and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        CHROME_POOL.warm()
     app.run(debug=True, threaded=True, port=5001) 
\ No newline at end of file
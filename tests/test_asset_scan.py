@@ -0,0 +1,31 @@
+"""Fallback URL scan over raw page markup."""
+import time
+
+import pytest
+
+from app import scan_asset_urls
+
+BASE_URL = 'https://example.com/shop/'
+
+@pytest.mark.parametrize('text, expected', [
+    # An apostrophe inside a JSON string
+    ('var m={"title":"It\'s here","logo":"/img/logo.png"}', ['https://example.com/img/logo.png']),
+    # An empty string right before the URL, as minified JS writes it
+    ('x=a?"":"/static/app.css"', ['https://example.com/static/app.css']),
+    # A quoted value with whitespace before another URL
+    ('<img src="/a b.png"><script>u="https://cdn.x/lib.js"</script>',
+     ['https://example.com/a b.png', 'https://cdn.x/lib.js']),
+    ('<br class="a"/><img src="/pixel"><link href=\'//cdn.example.net/s.css\'>',
+     ['https://example.com/pixel', 'https://cdn.example.net/s.css']),
+    ("loadCSS('css/site.css');loadJS(\"js/app.js\");window._ASSET_PREFIX_ = 'https://cdn.example.com'",
+     ['css/site.css', 'js/app.js', 'https://cdn.example.com']),
+    ('var s={"a":"/page","b":"{/tpl.js}"}', []),
+])
+def test_scan_asset_urls(text, expected):
+    assert scan_asset_urls(text, BASE_URL, time_limit=0) == expected
+
+def test_scan_is_linear_on_unclosed_quotes():
+    text = '"/' + 'a' * 2_000_000
+    started = time.monotonic()
+    assert scan_asset_urls(text, BASE_URL, time_limit=0) == []
+    assert time.monotonic() - started < 5
@@ -0,0 +1,82 @@
+"""Asset lists must not depend on the HTML parser backend chosen for a job."""
+import os
+
+import pytest
+from bs4.builder import builder_registry
+
+from app import ParsedDocument, extract_assets
+
+BASE_URL = 'https://example.com/shop/'
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates')
+
+UNCLOSED_PAGE = """<!DOCTYPE html>
+<html><head>
+<title>Unclosed tags</title>
+<link rel="stylesheet" href="/css/site.css">
+<script src="js/app.js"></script>
+</head>
+<body>
+<div class="hero" style="background-image: url('/img/hero.jpg')">
+<p>First paragraph
+<p>Second paragraph <img src="img/inline.png">
+<ul><li>One<li>Two <img src="/img/two.webp"></ul>
+<table><tr><td><img src="/img/cell.gif"><td>Cell
+</table>
+<video src="/media/intro.mp4" poster="/img/poster.jpg">
+<audio src="/media/theme.mp3">
+<link rel="icon" href="/favicon.ico">
+</body>
+"""
+
+SRCSET_PAGE = """<!DOCTYPE html>
+<html><head>
+<title>Responsive</title>
+<link rel="preload" as="style" href="/css/critical.css">
+<link rel="preload" as="font" href="/fonts/inter.woff2" crossorigin>
+<link rel="preload" as="script" href="/js/vendor.js">
+<link rel="stylesheet" href="https://fonts.googleapis.com/css2?family=Inter&display=swap">
+<link rel="apple-touch-icon" href="/apple-touch-icon.png">
+</head>
+<body>
+<img src="/img/small.jpg" srcset="/img/small.jpg 480w, /img/medium.jpg 960w, /img/large.jpg 1920w" sizes="100vw">
+<picture>
+  <source type="image/avif" srcset="/img/photo.avif 1x, /img/photo@2x.avif 2x">
+  <img src="/img/photo.jpg" alt="">
+</picture>
+<script type="module" src="/js/main.mjs"></script>
+</body></html>
+"""
+
+def load_template(name):
+    with open(os.path.join(TEMPLATES_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+PAGES = {
+    'templates/index.html': lambda: load_template('index.html'),
+    'unclosed tags': lambda: UNCLOSED_PAGE,
+    'srcset and preload': lambda: SRCSET_PAGE,
+}
+
+BACKENDS = [name for name in ('html.parser', 'lxml', 'html5lib') if builder_registry.lookup(name) is not None]
+
+ASSET_TYPES = ['css', 'js', 'img', 'fonts', 'videos', 'audio', 'favicons']
+
+def asset_lists(html_content, backend):
+    document = ParsedDocument(html_content, backend=backend)
+    assets = extract_assets(document, BASE_URL)
+    assert document.parser == backend
+    lists = {asset_type: assets.get(asset_type, []) for asset_type in ASSET_TYPES}
+    lists['font_families'] = sorted(assets.get('font_families', []))
+    return lists
+
+@pytest.mark.parametrize('page', list(PAGES))
+@pytest.mark.parametrize('backend', [name for name in BACKENDS if name != 'html.parser'])
+def test_asset_lists_match_html_parser(page, backend):
+    html_content = PAGES[page]()
+    assert asset_lists(html_content, backend) == asset_lists(html_content, 'html.parser')
+
+@pytest.mark.parametrize('page', list(PAGES))
+def test_pages_have_assets(page):
+    lists = asset_lists(PAGES[page](), 'html.parser')
+    assert any(lists[asset_type] for asset_type in ASSET_TYPES)
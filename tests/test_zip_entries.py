@@ -0,0 +1,70 @@
+"""Archive entries copied from the blob store must read back like writestr() entries."""
+import hashlib
+import os
+import zipfile
+import zlib
+
+import pytest
+
+import app
+from app import BlobStore, write_precompressed_entry
+
+TEXT = b'body { color: #333; }\n' * 500
+BINARY = bytes(range(256)) * 64
+
+def raw_deflate(data):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush()
+
+def entry_for(data):
+    return {'body': data, 'body_path': None, 'size': len(data), 'sha256': hashlib.sha256(data).hexdigest()}
+
+def check_archive(path, expected):
+    with zipfile.ZipFile(path) as zipf:
+        assert zipf.testzip() is None
+        assert zipf.namelist() == list(expected)
+        for name, data in expected.items():
+            assert zipf.read(name) == data
+            assert zipf.getinfo(name).CRC == zlib.crc32(data)
+            assert zipf.getinfo(name).file_size == len(data)
+
+@pytest.mark.skipif(not app.ZIP_PRECOMPRESSED_WRITES, reason='precompressed writes are off on this Python')
+def test_precompressed_entries_between_writestr_calls(tmp_path):
+    path = tmp_path / 'mixed.zip'
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        zipf.writestr('index.html', b'<html></html>')
+        compressed = raw_deflate(TEXT)
+        with open(tmp_path / 'text.blob', 'wb') as f:
+            f.write(compressed)
+        with open(tmp_path / 'text.blob', 'rb') as data_file:
+            write_precompressed_entry(zipf, 'css/site.css', data_file, zipfile.ZIP_DEFLATED,
+                                      len(compressed), zlib.crc32(TEXT), len(TEXT))
+        info = zipf.getinfo('css/site.css')
+        assert (info.CRC, info.compress_size, info.file_size) == (zlib.crc32(TEXT), len(compressed), len(TEXT))
+        zipf.writestr('js/app.js', b'console.log(1);')
+        with open(tmp_path / 'binary.blob', 'wb') as f:
+            f.write(BINARY)
+        with open(tmp_path / 'binary.blob', 'rb') as data_file:
+            write_precompressed_entry(zipf, 'img/photo.jpg', data_file, zipfile.ZIP_STORED,
+                                      len(BINARY), zlib.crc32(BINARY), len(BINARY))
+        zipf.writestr('README.md', b'# Archive')
+    check_archive(path, {'index.html': b'<html></html>', 'css/site.css': TEXT, 'js/app.js': b'console.log(1);',
+                         'img/photo.jpg': BINARY, 'README.md': b'# Archive'})
+
+@pytest.mark.parametrize('precompressed', [True, False])
+def test_blob_store_entries(tmp_path, monkeypatch, precompressed):
+    if precompressed and not app.ZIP_PRECOMPRESSED_WRITES:
+        pytest.skip('precompressed writes are off on this Python')
+    monkeypatch.setattr(app, 'ZIP_PRECOMPRESSED_WRITES', precompressed)
+    store = BlobStore(str(tmp_path / 'blobs'), 10 ** 8)
+    path = tmp_path / 'blobs.zip'
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        zipf.writestr('index.html', b'<html></html>')
+        store.write_to_zip(zipf, 'css/site.css', entry_for(TEXT))
+        store.write_to_zip(zipf, 'css/copy.css', entry_for(TEXT))  # Reused blob
+        store.write_to_zip(zipf, 'fonts/inter.woff2', entry_for(BINARY))
+        zipf.writestr('README.md', b'# Archive')
+    assert store.stats['blobs_reused'] == 1
+    assert len(os.listdir(tmp_path / 'blobs')) == 4
+    check_archive(path, {'index.html': b'<html></html>', 'css/site.css': TEXT, 'css/copy.css': TEXT,
+                         'fonts/inter.woff2': BINARY, 'README.md': b'# Archive'})